@@ -0,0 +1,114 @@
+"""Approximate nearest-neighbour search over the embedding matrix.
+
+An inverted-file (IVF) index clusters the normalized embedding rows with
+spherical k-means. A query is compared with the cluster centroids first,
+and only the rows in the ``nprobe`` closest clusters are scored exactly.
+Raising ``nprobe`` trades latency for recall; probing every list is
+equivalent to exact search.
+"""
+
+import os
+
+import numpy as np
+
+from retrieval import normalize
+
+
+def ann_path_for(matrix_path):
+    """Return the IVF index path that belongs to an embedding store."""
+    return os.path.splitext(matrix_path)[0] + ".ivf.npz"
+
+
+def _assign(matrix, centroids, chunk_size=8192):
+    """Index of the most similar centroid for every row, computed in chunks."""
+    labels = np.empty(matrix.shape[0], dtype=np.int32)
+    for start in range(0, matrix.shape[0], chunk_size):
+        block = np.asarray(matrix[start:start + chunk_size], dtype=np.float32)
+        labels[start:start + chunk_size] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+class IVFIndex:
+    """Inverted-file index: centroids plus the matrix rows of each list.
+
+    Rows of list ``i`` are ``rows[offsets[i]:offsets[i + 1]]``.
+    """
+
+    def __init__(self, centroids, offsets, rows, count):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.rows = rows
+        self.count = count
+
+    @property
+    def n_lists(self):
+        return self.centroids.shape[0]
+
+    @classmethod
+    def build(cls, matrix, n_lists=None, iterations=10, sample_size=65536, seed=0):
+        """Cluster the (L2-normalized) rows of ``matrix`` into ``n_lists`` lists.
+
+        Centroids are trained on at most ``sample_size`` rows, then every
+        row is assigned to its closest centroid.
+        """
+        count = matrix.shape[0]
+        if n_lists is None:
+            n_lists = max(1, int(4 * np.sqrt(count)))
+        n_lists = min(n_lists, count)
+        rng = np.random.default_rng(seed)
+
+        sample_idx = rng.choice(count, size=min(sample_size, count), replace=False)
+        sample = np.asarray(matrix[np.sort(sample_idx)], dtype=np.float32)
+        centroids = sample[rng.choice(sample.shape[0], size=n_lists, replace=False)].copy()
+
+        for _ in range(iterations):
+            labels = _assign(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=n_lists)
+            empty = counts == 0
+            # Re-seed empty lists with random sample rows
+            sums[empty] = sample[rng.choice(sample.shape[0], size=int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = sums / np.where(norms == 0, 1, norms)
+
+        labels = _assign(matrix, centroids)
+        order = np.argsort(labels, kind="stable").astype(np.int64)
+        offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(labels, minlength=n_lists))
+        return cls(centroids.astype(np.float32), offsets, order, count)
+
+    def save(self, path):
+        """Write the index to ``path`` (``.npz``) atomically."""
+        with open(path + ".tmp", "wb") as f:
+            np.savez(
+                f,
+                centroids=self.centroids,
+                offsets=self.offsets,
+                rows=self.rows,
+                count=np.asarray(self.count),
+            )
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path):
+        """Load an index written by ``save``."""
+        with np.load(path) as data:
+            return cls(
+                data["centroids"],
+                data["offsets"],
+                data["rows"],
+                int(data["count"]),
+            )
+
+    def candidate_rows(self, query_vec, nprobe=8):
+        """Matrix rows in the ``nprobe`` lists closest to ``query_vec``."""
+        nprobe = min(nprobe, self.n_lists)
+        sims = self.centroids @ normalize(query_vec)
+        if nprobe < self.n_lists:
+            probe = np.argpartition(-sims, nprobe - 1)[:nprobe]
+        else:
+            probe = np.arange(self.n_lists)
+        return np.concatenate([
+            self.rows[self.offsets[i]:self.offsets[i + 1]] for i in probe
+        ])
@@ -1,20 +1,72 @@
 """Configuration and constants for the Judith Tribute App."""
 
+import os
 import streamlit as st
 
 # File paths
 LETTERS_PATH = "data/letters.json"
+LETTERS_DB_PATH = "data/letters.sqlite"  # Built from LETTERS_PATH when missing or stale
+LEXICAL_INDEX_PATH = "data/letters_lexical.npz"  # Built from LETTERS_PATH when missing or stale
 IMAGES_DIR = "data/all_letters"
-EMBEDDINGS_PATH = "data/letter_embeddings.json"
+ARCHIVE_PDF_DIR = "archive/originals"  # Multi-page PDF scans
+RASTER_DIR = "data/pdf_pages"  # One JPEG per PDF page (archive/temp_images holds legacy pages, not read)
+RASTER_MANIFEST_PATH = "data/raster_manifest.json"
+EMBEDDINGS_PATH = "data/letter_embeddings.json"  # Legacy format, read only as a fallback
+EMBEDDINGS_MATRIX_PATH = "data/letter_embeddings.npy"
 PHOTOS_DIR = "data/photos"
+QUERY_CACHE_PATH = "data/query_cache.sqlite"
+DERIVATIVES_DIR = "data/derivatives"
+PHOTO_MANIFEST_PATH = "data/photo_manifest.json"
+HERO_PHOTO = "IMG_7240.jpg"  # File name in PHOTOS_DIR shown on the home page
+STRANGE_PATH = "data/strange.json"  # Scans the OCR step could not classify as letters
+OCR_CACHE_DIR = "data/ocr_cache"
+OCR_JOURNAL_PATH = "data/ocr_journal.jsonl"
+INGEST_STATE_PATH = "data/ingest_state.json"  # Input hashes of the last ingest run
+INGEST_LOG_DIR = "data/ingest_logs"
+
+# Image derivatives (pixel widths of the pre-generated WebP versions)
+DERIVATIVE_WIDTHS = (320, 640, 1280)
+LETTER_IMAGE_WIDTH = 480  # Approximate width of the image column in a letter card
+PHOTO_GRID_WIDTH = 640  # Photo gallery cells
+PHOTO_FULL_WIDTH = 2048  # "Full size" photos, capped to keep transfers reasonable
+
+# OCR uploads (scans are downsampled and re-encoded to fit the budget)
+OCR_LONG_EDGE = 1600
+OCR_MAX_BYTES = 300_000
+
+# Instrumentation (per-rerun spans, viewable on the admin page when enabled)
+INSTRUMENTATION = os.getenv("INSTRUMENTATION", "off")  # "off", "timing" or "memory" (timing plus tracemalloc)
+INSTRUMENTATION_LOG_PATH = "data/instrumentation.jsonl"
+INSTRUMENTATION_LOG_BYTES = 5_000_000  # Rotated at this size
+INSTRUMENTATION_LOG_BACKUPS = 3
+
+# Search configuration
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")  # "openai" or "local"
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL")  # None uses the backend's default model
+QUERY_CACHE_SIZE = 1024
+SEARCH_TOP_K = 10  # Default number of results; adjustable on the search page
+SEARCH_THRESHOLD = 0.2  # Minimum cosine similarity for semantic results
+HYBRID_CANDIDATES = 100  # Candidates taken from each retriever before fusion
+HYBRID_SEMANTIC_WEIGHT = 0.5  # Share of the fused score given to semantic ranks
+HYBRID_PRUNE = False  # Score only the keyword candidates semantically when there are enough of them
+RRF_K = 60  # Reciprocal-rank fusion constant
+ANN_MIN_ROWS = 20000  # Below this many embeddings no ANN index is built (unless --ann)
+ANN_NPROBE = 32  # IVF lists scanned per query: higher means better recall, slower search
+SUGGESTED_QUERIES = [
+    "Cartas sobre aniversários ou celebrações",
+    "Mensagens de amigos da infância",
+    "Cartas recebidas durante os feriados",
+    "Correspondências sobre trabalho ou carreira",
+    "Mensagens de apoio e encorajamento",
+    "Cartas de familiares distantes",
+]
 
 # App configuration
 PAGE_TITLE = "Tribute to Judith"
 PAGE_ICON = "💌"
 
-def apply_custom_css():
-    """Apply custom CSS styling to the app."""
-    st.markdown(
+# Built once at import; whitespace is collapsed to keep the per-run payload small
+CUSTOM_CSS = " ".join(
         """
         <style>
         @import url('https://fonts.googleapis.com/css2?family=Montserrat:wght@300;400;600;700&display=swap');
@@ -144,6 +196,13 @@ def apply_custom_css():
             font-family: 'Montserrat', sans-serif;
         }
         </style>
-        """,
-        unsafe_allow_html=True
-    )
+        """.split()
+)
+
+def apply_custom_css():
+    """Apply custom CSS styling to the app.
+
+    Called once per full run by ``main``: Streamlit drops elements a full
+    run does not emit again, while fragment reruns keep the page's styles.
+    """
+    st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
@@ -0,0 +1,164 @@
+"""Process-wide, read-only snapshot of the letter corpus.
+
+A ``Corpus`` bundles the letter store with every index derived from it
+(facets, BM25, embeddings, ANN). It is identified by a version computed from
+the size and modification time of the source files, so a re-run of the
+ingest produces a new version and a fresh snapshot instead of stale data.
+Sessions share one instance by reference; numpy arrays inside it are marked
+read-only so no caller can mutate shared state by accident.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+from ann_index import IVFIndex, ann_path_for
+from embedding_store import (
+    embedding_matrix_from_store,
+    index_path_for,
+    load_embedding_store,
+    store_from_records,
+)
+from facets import FacetIndex
+from letter_store import LetterView, ensure_letter_store
+from lexical_index import ensure_lexical_index
+
+
+def corpus_version(paths):
+    """Short version string over the size and mtime of ``paths``.
+
+    Missing files count as a distinct state, so creating one changes the
+    version too. Costs one ``stat`` per path.
+    """
+    parts = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            parts.append(f"{path}:{stat.st_size}:{stat.st_mtime_ns}")
+        except FileNotFoundError:
+            parts.append(f"{path}:-")
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:12]
+
+
+def _freeze(*arrays):
+    for array in arrays:
+        if isinstance(array, np.ndarray) and array.flags.writeable:
+            array.flags.writeable = False
+
+
+class Corpus:
+    """Letters plus derived indexes for one version of the source files.
+
+    Every part is built on first use and then kept for the lifetime of the
+    snapshot; a lock makes sure concurrent sessions build each part once.
+    """
+
+    def __init__(
+        self,
+        version,
+        letters_path,
+        letters_db_path,
+        lexical_index_path,
+        embeddings_matrix_path,
+        legacy_embeddings_path,
+    ):
+        self.version = version
+        self._letters_path = letters_path
+        self._letters_db_path = letters_db_path
+        self._lexical_index_path = lexical_index_path
+        self._embeddings_matrix_path = embeddings_matrix_path
+        self._legacy_embeddings_path = legacy_embeddings_path
+        self._lock = threading.RLock()
+        self._parts = {}
+
+    @staticmethod
+    def source_paths(letters_path, embeddings_matrix_path, legacy_embeddings_path):
+        """Files whose changes produce a new corpus version."""
+        return (
+            letters_path,
+            embeddings_matrix_path,
+            index_path_for(embeddings_matrix_path),
+            ann_path_for(embeddings_matrix_path),
+            legacy_embeddings_path,
+        )
+
+    def _part(self, name, build):
+        part = self._parts.get(name)
+        if part is None:
+            with self._lock:
+                part = self._parts.get(name)
+                if part is None:
+                    part = build()
+                    self._parts[name] = part
+        return part
+
+    @property
+    def letters(self):
+        """List-like ``LetterView`` over the letter store, rebuilt first if stale."""
+        return self._part(
+            "letters",
+            lambda: LetterView(ensure_letter_store(self._letters_path, self._letters_db_path))
+        )
+
+    @property
+    def facets(self):
+        def build():
+            facets = FacetIndex(self.letters.metadata())
+            _freeze(facets.date_keys, facets.date_positions, *facets.senders.values(), *facets.recipients.values())
+            return facets
+        return self._part("facets", build)
+
+    @property
+    def lexical_index(self):
+        def build():
+            index = ensure_lexical_index(self._letters_path, self._lexical_index_path)
+            _freeze(index.offsets, index.docs, index.tfs, index.doc_len, index.length_norm)
+            return index
+        return self._part("lexical_index", build)
+
+    @property
+    def embeddings(self):
+        """The binary embedding store, or the legacy JSON file converted in memory."""
+        def build():
+            if os.path.exists(self._embeddings_matrix_path):
+                return load_embedding_store(self._embeddings_matrix_path)
+            with open(self._legacy_embeddings_path, "r", encoding="utf-8") as f:
+                store = store_from_records(json.load(f))
+            # The legacy JSON file was always produced by OpenAI's default model
+            store.meta.update(backend="openai", model="text-embedding-3-small")
+            _freeze(store.matrix)
+            return store
+        return self._part("embeddings", build)
+
+    @property
+    def embedding_matrix(self):
+        """Embeddings aligned with the letters (zero-copy when they match)."""
+        def build():
+            emb_matrix = embedding_matrix_from_store(self.embeddings, self.letters.ids())
+            _freeze(*emb_matrix)
+            return emb_matrix
+        return self._part("embedding_matrix", build)
+
+    @property
+    def ann_index(self):
+        """The IVF index built for this store, if any; None means search stays exact.
+
+        Whether to build one is decided when the store is generated (large
+        stores, or ``--ann``), so any index matching the store is used.
+        """
+        def build():
+            matrix = self.embedding_matrix.matrix
+            path = ann_path_for(self._embeddings_matrix_path)
+            if not os.path.exists(path):
+                return False
+            ann = IVFIndex.load(path)
+            # An index built for another version of the store would return wrong rows
+            if ann.count != matrix.shape[0]:
+                return False
+            _freeze(ann.centroids, ann.offsets, ann.rows)
+            return ann
+        # False marks "no index" so the check is not repeated on every call
+        return self._part("ann_index", build) or None
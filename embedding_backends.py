@@ -0,0 +1,88 @@
+"""Pluggable embedding backends for letters and search queries.
+
+Each backend exposes ``name``, ``model``, ``dim``, ``embed_documents`` for
+batches of letter texts and ``embed_query`` for a single search query. The
+embedding store records the backend and model that produced it so the
+search page always encodes queries the same way.
+"""
+
+import os
+
+import numpy as np
+
+DEFAULT_MODELS = {
+    "openai": "text-embedding-3-small",
+    "local": "paraphrase-multilingual-MiniLM-L12-v2",
+}
+
+
+class OpenAIBackend:
+    """Remote embeddings from the OpenAI API."""
+
+    name = "openai"
+
+    def __init__(self, model=None):
+        from openai import OpenAI
+
+        self.model = model or DEFAULT_MODELS[self.name]
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY not found in environment variables.")
+        self.client = OpenAI(api_key=api_key)
+        self.dim = None
+
+    def embed_documents(self, texts):
+        """Embed a batch of texts with one API request."""
+        response = self.client.embeddings.create(model=self.model, input=list(texts))
+        data = sorted(response.data, key=lambda item: item.index)
+        vectors = np.asarray([item.embedding for item in data], dtype=np.float32)
+        self.dim = vectors.shape[1]
+        return vectors
+
+    def embed_query(self, text):
+        """Embed a single search query."""
+        return self.embed_documents([text])[0]
+
+
+class SentenceTransformerBackend:
+    """Local, offline embeddings computed in-process on CPU."""
+
+    name = "local"
+
+    def __init__(self, model=None, device="cpu", batch_size=32):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = model or DEFAULT_MODELS[self.name]
+        self.batch_size = batch_size
+        self.encoder = SentenceTransformer(self.model, device=device)
+        self.dim = self.encoder.get_sentence_embedding_dimension()
+
+    def embed_documents(self, texts):
+        """Encode a batch of texts into normalized vectors."""
+        return self.encoder.encode(
+            list(texts),
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        ).astype(np.float32, copy=False)
+
+    def embed_query(self, text):
+        """Encode a single search query."""
+        return self.embed_documents([text])[0]
+
+
+BACKENDS = {
+    OpenAIBackend.name: OpenAIBackend,
+    SentenceTransformerBackend.name: SentenceTransformerBackend,
+}
+
+
+def get_backend(name, model=None):
+    """Instantiate the backend registered under ``name``."""
+    try:
+        backend_cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown embedding backend '{name}'. Choose one of: {', '.join(BACKENDS)}"
+        )
+    return backend_cls(model=model)
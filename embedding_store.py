@@ -0,0 +1,120 @@
+"""Compact binary storage for letter embeddings.
+
+The store is a float32 ``.npy`` matrix with one L2-normalized row per
+embedded letter, plus a small JSON sidecar mapping each row to the letter's
+``image_path`` and recording how the vectors were produced. The matrix is
+memory-mapped on load, so every Streamlit worker shares the same pages.
+"""
+
+import hashlib
+import json
+import os
+from typing import NamedTuple
+
+import numpy as np
+
+from retrieval import EmbeddingMatrix, build_embedding_matrix
+
+
+class EmbeddingStore(NamedTuple):
+    """A loaded embedding store: row matrix, row ids and sidecar metadata."""
+
+    matrix: np.ndarray
+    ids: list
+    meta: dict
+
+
+def text_hash(text):
+    """Content hash of a letter's text, used to detect changed letters."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def index_path_for(matrix_path):
+    """Return the sidecar path that belongs to ``matrix_path``."""
+    return os.path.splitext(matrix_path)[0] + ".index.json"
+
+
+def save_embedding_store(matrix_path, matrix, ids, **meta):
+    """Write ``matrix`` and its id sidecar, replacing any previous store.
+
+    Both files are written to temporary names first and renamed into place,
+    so readers never see a half-written store.
+    """
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    if matrix.ndim != 2 or matrix.shape[0] != len(ids):
+        raise ValueError(
+            f"Matrix shape {matrix.shape} does not match {len(ids)} ids"
+        )
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix = matrix / np.where(norms == 0, 1, norms)
+
+    directory = os.path.dirname(matrix_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    index = dict(meta)
+    index.update({
+        "ids": list(ids),
+        "count": int(matrix.shape[0]),
+        "dim": int(matrix.shape[1]),
+        "dtype": "float32",
+        "normalized": True,
+    })
+
+    index_path = index_path_for(matrix_path)
+    with open(matrix_path + ".tmp", "wb") as f:
+        np.save(f, matrix)
+    with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(matrix_path + ".tmp", matrix_path)
+    os.replace(index_path + ".tmp", index_path)
+
+
+def load_embedding_store(matrix_path, mmap=True):
+    """Load a store written by ``save_embedding_store``.
+
+    With ``mmap=True`` the matrix is mapped read-only instead of being read
+    into memory.
+    """
+    with open(index_path_for(matrix_path), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    ids = meta.pop("ids")
+    matrix = np.load(matrix_path, mmap_mode="r" if mmap else None)
+    if matrix.shape[0] != len(ids):
+        raise ValueError(
+            f"{matrix_path} has {matrix.shape[0]} rows but its index lists {len(ids)} ids"
+        )
+    return EmbeddingStore(matrix=matrix, ids=ids, meta=meta)
+
+
+def store_from_records(records):
+    """Build an in-memory store from legacy ``letter_embeddings.json`` records."""
+    packed = build_embedding_matrix(records)
+    ids = [records[i].get("image_path") for i in packed.row_to_letter]
+    return EmbeddingStore(matrix=packed.matrix, ids=ids, meta={"source": "json"})
+
+
+def embedding_matrix_from_store(store, letter_ids):
+    """Align a store's rows with the letters and return an ``EmbeddingMatrix``.
+
+    ``letter_ids`` lists each letter's ``image_path`` in display order.
+    Rows whose id no longer matches a letter are dropped. When every row
+    matches, the (memory-mapped) matrix is used as-is without copying.
+    """
+    positions = {letter_id: i for i, letter_id in enumerate(letter_ids)}
+    rows = []
+    row_to_letter = []
+    for row, letter_id in enumerate(store.ids):
+        pos = positions.get(letter_id)
+        if pos is not None:
+            rows.append(row)
+            row_to_letter.append(pos)
+
+    matrix = store.matrix
+    if len(rows) != matrix.shape[0]:
+        matrix = np.asarray(matrix[rows], dtype=np.float32)
+
+    valid = np.zeros(len(letter_ids), dtype=bool)
+    row_to_letter = np.asarray(row_to_letter, dtype=np.int64)
+    valid[row_to_letter] = True
+    return EmbeddingMatrix(matrix=matrix, valid=valid, row_to_letter=row_to_letter)
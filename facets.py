@@ -0,0 +1,103 @@
+"""Precomputed facet indexes over letter metadata.
+
+Dates are kept as a sorted array for range queries, and normalized sender
+and recipient names map to sorted posting lists of letter positions.
+Filters are combined by intersecting posting lists, so they cost
+O(log N + matches) rather than a scan over every letter.
+"""
+
+import numpy as np
+
+from lexical_index import fold
+
+
+def normalize_name(name):
+    """Accent-folded, case-folded, single-spaced form of a name."""
+    return " ".join(fold(name).split()) if name else None
+
+
+def _date_key(value):
+    """``YYYYMMDD`` integer for an ISO date string or ``datetime.date``."""
+    return int(str(value)[:10].replace("-", ""))
+
+
+class FacetIndex:
+    """Date, sender and recipient indexes built from ``LetterView.metadata()``."""
+
+    def __init__(self, metadata):
+        self.num_letters = len(metadata)
+
+        dated = sorted(
+            (_date_key(row["date_iso"]), row["position"])
+            for row in metadata
+            if row["date_iso"]
+        )
+        self.date_keys = np.asarray([key for key, _ in dated], dtype=np.int32)
+        self.date_positions = np.asarray([pos for _, pos in dated], dtype=np.int64)
+
+        self.senders, self.sender_labels = self._postings(metadata, "sender")
+        self.recipients, self.recipient_labels = self._postings(metadata, "recipient")
+
+    @staticmethod
+    def _postings(metadata, column):
+        """Posting lists and display labels for one name column."""
+        positions = {}
+        spellings = {}
+        for row in metadata:
+            key = normalize_name(row[column])
+            if not key:
+                continue
+            positions.setdefault(key, []).append(row["position"])
+            counts = spellings.setdefault(key, {})
+            counts[row[column]] = counts.get(row[column], 0) + 1
+        postings = {
+            key: np.asarray(sorted(values), dtype=np.int64)
+            for key, values in positions.items()
+        }
+        # Show the most common original spelling of each name
+        labels = {key: max(counts, key=counts.get) for key, counts in spellings.items()}
+        return postings, labels
+
+    def year_range(self):
+        """(first, last) year with a dated letter, or None if none are dated."""
+        if not self.date_keys.size:
+            return None
+        return int(self.date_keys[0]) // 10000, int(self.date_keys[-1]) // 10000
+
+    def sender_options(self):
+        """``(label, key, count)`` for every sender, most frequent first."""
+        return self._options(self.senders, self.sender_labels)
+
+    def recipient_options(self):
+        """``(label, key, count)`` for every recipient, most frequent first."""
+        return self._options(self.recipients, self.recipient_labels)
+
+    @staticmethod
+    def _options(postings, labels):
+        return sorted(
+            ((labels[key], key, int(values.size)) for key, values in postings.items()),
+            key=lambda option: (-option[2], option[0])
+        )
+
+    def filter(self, sender=None, recipient=None, date_from=None, date_to=None):
+        """Sorted letter positions matching every given filter.
+
+        Names are normalized before lookup. Dates may be ISO strings or
+        ``datetime.date`` objects and bound the range inclusively; letters
+        without a date are excluded once a date bound is set. Returns None
+        when no filter is active, meaning every letter matches.
+        """
+        result = None
+
+        def intersect(current, positions):
+            return positions if current is None else np.intersect1d(current, positions, assume_unique=True)
+
+        if sender:
+            result = intersect(result, self.senders.get(normalize_name(sender), np.empty(0, dtype=np.int64)))
+        if recipient:
+            result = intersect(result, self.recipients.get(normalize_name(recipient), np.empty(0, dtype=np.int64)))
+        if date_from is not None or date_to is not None:
+            lo = 0 if date_from is None else np.searchsorted(self.date_keys, _date_key(date_from), side="left")
+            hi = self.date_keys.size if date_to is None else np.searchsorted(self.date_keys, _date_key(date_to), side="right")
+            result = intersect(result, np.sort(self.date_positions[lo:hi]))
+        return result
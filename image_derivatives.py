@@ -0,0 +1,101 @@
+"""Width-bounded WebP derivatives of letter scans and photos.
+
+Derivatives live in a cache directory and are named after the source file
+plus a key derived from its path, size and mtime, so editing or replacing a
+source image automatically produces fresh derivatives.
+"""
+
+import hashlib
+import os
+import tempfile
+
+from PIL import Image, ImageOps
+
+try:
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+except ImportError:
+    # HEIC sources will fail to open; every other format still works
+    pass
+
+DERIVATIVE_FORMAT = "webp"
+
+
+def source_key(src):
+    """Short key identifying the current version of ``src``."""
+    stat = os.stat(src)
+    raw = f"{os.path.abspath(src)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+
+def derivative_path(src, width, cache_dir):
+    """Path of the ``width``-pixel derivative of ``src`` inside ``cache_dir``."""
+    stem = os.path.splitext(os.path.basename(src))[0]
+    return os.path.join(
+        cache_dir,
+        f"{stem}-{source_key(src)}-w{width}.{DERIVATIVE_FORMAT}"
+    )
+
+
+def open_image(src, min_size=None):
+    """Decode ``src`` into an upright RGB image.
+
+    With ``min_size``, formats that support it (JPEG) are decoded at the
+    smallest 1/2, 1/4 or 1/8 scale that keeps both sides at least that
+    large. EXIF orientation is applied so rotated phone photos display
+    correctly.
+    """
+    with Image.open(src) as img:
+        if min_size:
+            img.draft("RGB", (min_size, min_size))
+        img = ImageOps.exif_transpose(img)
+        return img.convert("RGB")
+
+
+def make_derivatives(src, widths, cache_dir, quality=80):
+    """Create any missing derivatives of ``src``; return ``{width: path}``.
+
+    The source is decoded once for all requested widths, at reduced scale
+    when the format supports it. Images narrower than a width are
+    re-encoded without upscaling. Files are written under a temporary name
+    and renamed, so concurrent sessions never serve a partial image.
+    """
+    paths = {width: derivative_path(src, width, cache_dir) for width in widths}
+    missing = sorted(
+        (width for width, path in paths.items() if not os.path.exists(path)),
+        reverse=True
+    )
+    if not missing:
+        return paths
+
+    os.makedirs(cache_dir, exist_ok=True)
+    img = open_image(src, min_size=missing[0])
+    for width in missing:
+        if img.width > width:
+            height = round(img.height * width / img.width)
+            img = img.resize((width, height), Image.LANCZOS)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                img.save(f, format=DERIVATIVE_FORMAT, quality=quality, method=4)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, paths[width])
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    return paths
+
+
+def make_derivative(src, width, cache_dir, quality=80):
+    """Create the ``width``-pixel derivative of ``src`` if needed; return its path."""
+    return make_derivatives(src, [width], cache_dir, quality)[width]
+
+
+def best_derivative(src, target_width, widths, cache_dir):
+    """Path of the smallest derivative at least ``target_width`` wide.
+
+    Falls back to the largest configured width when none is wide enough.
+    """
+    widths = sorted(widths)
+    width = next((w for w in widths if w >= target_width), widths[-1])
+    return make_derivative(src, width, cache_dir)
@@ -0,0 +1,198 @@
+"""Per-rerun timing and memory spans for the app's hot paths.
+
+Code marks a hot path with ``with span("name"):``. While a rerun is being
+recorded (``with rerun(page):`` around the script), every span adds its
+wall time and, in memory mode, its tracemalloc deltas to the rerun's
+totals; when the rerun ends one JSON line with per-span call counts and
+totals is written to a rotating log file.
+
+When instrumentation is not configured, ``span`` returns a shared no-op
+context manager, so a disabled span costs one global lookup and a call.
+
+tracemalloc counts the allocations of the whole process, so with several
+sessions rerunning at once the memory figures include their work too.
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+_enabled = False
+_trace_memory = False
+_local = threading.local()
+_logger = logging.getLogger("instrumentation")
+
+
+class _NoSpan:
+    """Context manager that does nothing; returned while disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def configure(log_path, trace_memory=False, max_bytes=5_000_000, backup_count=3):
+    """Enable recording, writing reruns to ``log_path`` (rotated at ``max_bytes``)."""
+    global _enabled, _trace_memory
+    directory = os.path.dirname(log_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    handler = logging.handlers.RotatingFileHandler(
+        log_path,
+        maxBytes=max_bytes,
+        backupCount=backup_count,
+        encoding="utf-8"
+    )
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    for old in list(_logger.handlers):
+        _logger.removeHandler(old)
+        old.close()
+    _logger.addHandler(handler)
+    _logger.setLevel(logging.INFO)
+    _logger.propagate = False
+
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _trace_memory = trace_memory
+    _enabled = True
+
+
+def enabled():
+    return _enabled
+
+
+class _Span:
+    """A running span; nested spans report their memory peak to the parent."""
+
+    __slots__ = ("name", "stack", "start", "start_mem", "peak")
+
+    def __init__(self, name, stack):
+        self.name = name
+        self.stack = stack
+
+    def __enter__(self):
+        if _trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self.stack:
+                parent = self.stack[-1]
+                parent.peak = max(parent.peak, peak)
+            # Peaks are tracked per span from here on; the parent keeps its own maximum
+            tracemalloc.reset_peak()
+            self.start_mem = self.peak = current
+        self.stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        self.stack.pop()
+        alloc = peak = 0
+        if _trace_memory:
+            current, traced_peak = tracemalloc.get_traced_memory()
+            self.peak = max(self.peak, traced_peak)
+            alloc = current - self.start_mem
+            peak = self.peak - self.start_mem
+            if self.stack:
+                parent = self.stack[-1]
+                parent.peak = max(parent.peak, self.peak)
+        _local.record.add(self.name, seconds, alloc, peak)
+        return False
+
+
+class _Rerun:
+    """Totals of one script run, keyed by span name."""
+
+    def __init__(self, page):
+        self.page = page
+        self.spans = {}
+
+    def add(self, name, seconds, alloc, peak):
+        totals = self.spans.get(name)
+        if totals is None:
+            totals = self.spans[name] = {"calls": 0, "ms": 0.0, "max_ms": 0.0, "alloc_kb": 0.0, "peak_kb": 0.0}
+        ms = seconds * 1000
+        totals["calls"] += 1
+        totals["ms"] += ms
+        totals["max_ms"] = max(totals["max_ms"], ms)
+        totals["alloc_kb"] += alloc / 1024
+        totals["peak_kb"] = max(totals["peak_kb"], peak / 1024)
+
+
+def span(name):
+    """Context manager timing one hot path of the current rerun."""
+    if not _enabled or getattr(_local, "record", None) is None:
+        return _NO_SPAN
+    return _Span(name, _local.stack)
+
+
+class rerun:
+    """Record the spans of one script run and log them when it ends.
+
+    ``page`` may be set on the returned object once it is known. A run cut
+    short by an exception (including Streamlit's rerun/stop signals) is
+    still logged, marked as interrupted. Inside a run that is already being
+    recorded it does nothing, so a fragment can wrap its body in ``rerun``:
+    its partial reruns are logged on their own (with ``fragment`` set) and
+    its full-run executions count towards the full run.
+    """
+
+    def __init__(self, page=None, fragment=None):
+        self.page = page
+        self.fragment = fragment
+        self._span = None
+
+    def __enter__(self):
+        if _enabled and getattr(_local, "record", None) is None:
+            _local.record = _Rerun(self.page)
+            _local.stack = []
+            self._span = _Span("rerun", _local.stack).__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._span is None:
+            return False
+        self._span.__exit__(exc_type, exc, tb)
+        record = _local.record
+        _local.record = None
+        total = record.spans.pop("rerun")
+        _logger.info(json.dumps({
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "page": self.page,
+            "fragment": self.fragment,
+            "ms": round(total["ms"], 3),
+            "alloc_kb": round(total["alloc_kb"], 1),
+            "peak_kb": round(total["peak_kb"], 1),
+            "interrupted": exc_type is not None,
+            "spans": {
+                name: {key: round(value, 3) for key, value in totals.items()}
+                for name, totals in record.spans.items()
+            },
+        }, ensure_ascii=False))
+        return False
+
+
+def read_log(log_path, limit=500):
+    """The last ``limit`` rerun records, oldest first, across rotated files."""
+    records = deque(maxlen=limit)
+    paths = [f"{log_path}.{i}" for i in range(9, 0, -1)] + [log_path]
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # Torn last line while a rerun is being written
+                    continue
+    return list(records)
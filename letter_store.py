@@ -0,0 +1,188 @@
+"""SQLite-backed letter store with typed columns.
+
+``letters.json`` is compiled into a small SQLite database with one row per
+letter in the original order. Dates are parsed into sortable ISO strings and
+a year column. Pages can fetch only the rows they display, and
+``LetterView`` gives list-like access without loading every letter's text.
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime
+from urllib.parse import quote
+
+SCHEMA = """
+CREATE TABLE letters (
+    position INTEGER PRIMARY KEY,
+    image_path TEXT,
+    sender TEXT,
+    recipient TEXT,
+    date TEXT,
+    date_iso TEXT,
+    year INTEGER,
+    title TEXT,
+    text TEXT,
+    text_length INTEGER NOT NULL
+);
+CREATE INDEX letters_image_path ON letters (image_path);
+CREATE INDEX letters_date_iso ON letters (date_iso);
+"""
+
+META_COLUMNS = "position, image_path, sender, recipient, date, date_iso, year, title, text_length"
+FULL_COLUMNS = "position, image_path, sender, recipient, date, date_iso, year, title, text"
+
+
+def parse_date(value):
+    """Parse a ``DD/MM/AAAA`` date into an ISO string, or None."""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value.strip(), "%d/%m/%Y").date().isoformat()
+    except ValueError:
+        return None
+
+
+def build_letter_store(json_path, db_path):
+    """Compile ``json_path`` into a fresh SQLite store at ``db_path``."""
+    with open(json_path, "r", encoding="utf-8") as f:
+        letters = json.load(f)
+
+    tmp_path = db_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA)
+        rows = []
+        for position, letter in enumerate(letters):
+            date_iso = parse_date(letter.get("date"))
+            text = letter.get("text")
+            rows.append((
+                position,
+                letter.get("image_path"),
+                letter.get("from"),
+                letter.get("to"),
+                letter.get("date"),
+                date_iso,
+                int(date_iso[:4]) if date_iso else None,
+                letter.get("title"),
+                text,
+                len(text or ""),
+            ))
+        conn.executemany("INSERT INTO letters VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, db_path)
+
+
+def ensure_letter_store(json_path, db_path):
+    """Rebuild the store if it is missing or older than ``json_path``.
+
+    Returns the path of an up-to-date store. If ``db_path`` cannot be
+    written (read-only deployment), the store is built in the temp folder.
+    """
+    if (
+        os.path.exists(db_path)
+        and os.path.getmtime(db_path) >= os.path.getmtime(json_path)
+    ):
+        return db_path
+    try:
+        build_letter_store(json_path, db_path)
+        return db_path
+    except (OSError, sqlite3.OperationalError):
+        fallback = os.path.join(tempfile.gettempdir(), os.path.basename(db_path))
+        if os.path.abspath(fallback) == os.path.abspath(db_path):
+            raise
+        return ensure_letter_store(json_path, fallback)
+
+
+def _row_to_letter(row):
+    """Convert a full row to the dict shape used throughout the app."""
+    letter = {
+        "image_path": row["image_path"],
+        "from": row["sender"],
+        "to": row["recipient"],
+        "date": row["date"],
+        "date_iso": row["date_iso"],
+        "year": row["year"],
+        "text": row["text"],
+    }
+    if row["title"] is not None:
+        letter["title"] = row["title"]
+    return letter
+
+
+class LetterView:
+    """Read-only, list-like view over the letter store.
+
+    ``len``, integer indexing and slicing work like on the list returned by
+    ``json.load``, but each access only reads the requested rows.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._length = self._execute("SELECT COUNT(*) FROM letters").fetchone()[0]
+
+    def _execute(self, sql, params=()):
+        """Run ``sql`` on this thread's read-only connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            uri = f"file:{quote(os.path.abspath(self.db_path))}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn.execute(sql, params)
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for row in self._execute(f"SELECT {FULL_COLUMNS} FROM letters ORDER BY position"):
+            yield _row_to_letter(row)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return self.page(start, stop - start)
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("letter index out of range")
+        return self.get_many([index])[0]
+
+    def page(self, offset, limit):
+        """Letters ``offset`` to ``offset + limit``, with text, in order."""
+        rows = self._execute(
+            f"SELECT {FULL_COLUMNS} FROM letters WHERE position >= ? AND position < ? ORDER BY position",
+            (offset, offset + max(limit, 0))
+        )
+        return [_row_to_letter(row) for row in rows]
+
+    def get_many(self, positions):
+        """Letters at the given positions, returned in the order requested."""
+        positions = [int(p) for p in positions]
+        if not positions:
+            return []
+        placeholders = ", ".join("?" * len(positions))
+        rows = self._execute(
+            f"SELECT {FULL_COLUMNS} FROM letters WHERE position IN ({placeholders})",
+            positions
+        )
+        by_position = {row["position"]: _row_to_letter(row) for row in rows}
+        return [by_position[p] for p in positions]
+
+    def ids(self):
+        """Every letter's ``image_path``, in order."""
+        return [row[0] for row in self._execute("SELECT image_path FROM letters ORDER BY position")]
+
+    def metadata(self):
+        """Every letter's columns except the text, as dicts in order."""
+        rows = self._execute(f"SELECT {META_COLUMNS} FROM letters ORDER BY position")
+        return [dict(row) for row in rows]
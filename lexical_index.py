@@ -0,0 +1,218 @@
+"""Portuguese full-text index with BM25 ranking.
+
+Letters are tokenized with accent folding, stopword removal and a light
+Portuguese stemmer, then stored as a compact inverted index (flat numpy
+posting arrays in a single ``.npz`` file). Queries are answered locally,
+without any network call.
+"""
+
+import json
+import os
+import re
+import unicodedata
+
+import numpy as np
+
+# Bump when tokenization changes so stale indexes are rebuilt
+ANALYZER_VERSION = 1
+
+FIELD_WEIGHTS = {"text": 1.0, "from": 2.0, "to": 2.0}
+
+STOPWORDS = frozenset("""
+a ao aos as ate com como da das de dela dele deles do dos e ela elas ele eles
+em entre era essa esse esta estas este estes eu foi for ha isso isto ja la lhe
+lhes mais mas me mesmo meu meus minha minhas muito na nao nas nem no nos nossa
+nossas nosso nossos num numa o os ou para pela pelas pelo pelos por quando que
+se sem ser seu seus so sua suas tambem te tem teu teus tu tua tuas um uma umas
+uns voce voces vos
+""".split())
+
+# (suffix, replacement) pairs tried in order; the first match wins
+PLURAL_SUFFIXES = (
+    ("oes", "ao"), ("aes", "ao"), ("ais", "al"), ("eis", "el"), ("ois", "ol"),
+    ("ns", "m"), ("res", "r"), ("les", "l"), ("s", ""),
+)
+# Applied after plural removal, so only singular forms are listed
+DERIVATIONAL_SUFFIXES = (
+    "amento", "imento", "mente", "zinho", "zinha", "inho", "inha",
+    "acao", "icao", "adora", "ador", "idade", "ismo", "ista",
+    "avel", "ivel", "oso", "osa", "eza",
+)
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def fold(text):
+    """Lower-case ``text`` and strip accents (``ç`` becomes ``c``)."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def stem(token):
+    """Light Portuguese stemmer: plural, common suffixes, final vowel."""
+    if len(token) <= 3 or token.isdigit():
+        return token
+    for suffix, replacement in PLURAL_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            token = token[:-len(suffix)] + replacement
+            break
+    for suffix in DERIVATIONAL_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 4:
+            token = token[:-len(suffix)]
+            break
+    if token[-1] in "aeo" and len(token) > 3:
+        token = token[:-1]
+    return token
+
+
+def analyze(text):
+    """Tokens of ``text`` as indexed: folded, stopwords removed, stemmed."""
+    if not text:
+        return []
+    return [
+        stem(token)
+        for token in TOKEN_RE.findall(fold(text))
+        if token not in STOPWORDS
+    ]
+
+
+class LexicalIndex:
+    """In-memory BM25 index over the letters.
+
+    Postings for term ``i`` are ``docs[offsets[i]:offsets[i + 1]]`` with
+    field-weighted term frequencies in ``tfs``. Document numbers are letter
+    positions in ``load_letters()``.
+    """
+
+    def __init__(self, terms, offsets, docs, tfs, doc_len, k1=1.2, b=0.75):
+        self.terms = terms
+        self.vocab = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.docs = docs
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.k1 = k1
+        self.b = b
+        self.num_docs = doc_len.size
+        avgdl = float(doc_len.mean()) if doc_len.size else 0.0
+        # Per-document BM25 length normalization, precomputed once
+        self.length_norm = (k1 * (1 - b + b * doc_len / avgdl)).astype(np.float32) if avgdl else doc_len
+
+    @classmethod
+    def build(cls, letters, **params):
+        """Index the ``text``, ``from`` and ``to`` fields of ``letters``."""
+        postings = {}
+        doc_len = np.zeros(len(letters), dtype=np.float32)
+        for position, letter in enumerate(letters):
+            counts = {}
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in analyze(letter.get(field)):
+                    counts[token] = counts.get(token, 0.0) + weight
+            doc_len[position] = sum(counts.values())
+            for token, tf in counts.items():
+                postings.setdefault(token, []).append((position, tf))
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        docs = []
+        tfs = []
+        for i, term in enumerate(terms):
+            entries = postings[term]
+            offsets[i + 1] = offsets[i] + len(entries)
+            docs.extend(doc for doc, _ in entries)
+            tfs.extend(tf for _, tf in entries)
+        return cls(
+            terms,
+            offsets,
+            np.asarray(docs, dtype=np.int32),
+            np.asarray(tfs, dtype=np.float32),
+            doc_len,
+            **params
+        )
+
+    def save(self, path):
+        """Write the index to ``path`` (``.npz``) atomically."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        meta = {"analyzer_version": ANALYZER_VERSION, "k1": self.k1, "b": self.b}
+        with open(path + ".tmp", "wb") as f:
+            np.savez(
+                f,
+                terms=np.asarray(self.terms, dtype=str),
+                offsets=self.offsets,
+                docs=self.docs,
+                tfs=self.tfs,
+                doc_len=self.doc_len,
+                meta=np.asarray(json.dumps(meta)),
+            )
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path):
+        """Load an index written by ``save``."""
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("analyzer_version") != ANALYZER_VERSION:
+                raise ValueError(f"{path} was built with an older analyzer; rebuild it")
+            return cls(
+                data["terms"].tolist(),
+                data["offsets"],
+                data["docs"],
+                data["tfs"],
+                data["doc_len"],
+                k1=meta["k1"],
+                b=meta["b"],
+            )
+
+    def scores(self, query):
+        """BM25 score of every letter for ``query`` (zeros when no term matches)."""
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        for term in set(analyze(query)):
+            i = self.vocab.get(term)
+            if i is None:
+                continue
+            start, end = self.offsets[i], self.offsets[i + 1]
+            docs = self.docs[start:end]
+            tf = self.tfs[start:end]
+            df = end - start
+            idf = np.log1p((self.num_docs - df + 0.5) / (df + 0.5))
+            # Each letter appears once per term, so fancy-index += is safe
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + self.length_norm[docs])
+        return scores
+
+    def search(self, query, k=10, allowed=None):
+        """Best ``k`` letters for ``query`` as ``(score, letter_index)`` tuples.
+
+        ``allowed``, a sorted array of letter positions, restricts the results
+        (for example to a facet filter).
+        """
+        scores = self.scores(query)
+        candidates = np.flatnonzero(scores > 0)
+        if allowed is not None:
+            candidates = np.intersect1d(candidates, allowed, assume_unique=True)
+        if candidates.size > k:
+            part = np.argpartition(-scores[candidates], k - 1)[:k]
+            candidates = candidates[part]
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(float(scores[doc]), int(doc)) for doc in order]
+
+
+def ensure_lexical_index(json_path, index_path):
+    """Load the index, rebuilding it if missing, stale or from an old analyzer."""
+    if (
+        os.path.exists(index_path)
+        and os.path.getmtime(index_path) >= os.path.getmtime(json_path)
+    ):
+        try:
+            return LexicalIndex.load(index_path)
+        except ValueError:
+            pass
+
+    with open(json_path, "r", encoding="utf-8") as f:
+        index = LexicalIndex.build(json.load(f))
+    try:
+        index.save(index_path)
+    except OSError:
+        # Read-only deployment: keep the freshly built index in memory
+        pass
+    return index
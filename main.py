@@ -4,17 +4,37 @@ Main entry point for the Streamlit application
 """
 
 import streamlit as st
+import importlib
+import threading
 import sys
 import os
 
 # Add the app directory to the Python path
 sys.path.append(os.path.dirname(__file__))
 
-from config import PAGE_TITLE, PAGE_ICON, apply_custom_css
-from page_modules.home import show_home_page
-from page_modules.gallery import show_gallery_page
-from page_modules.rag_search import show_rag_page
-from page_modules.photo_gallery import show_photo_gallery_page
+from config import (
+    PAGE_TITLE,
+    PAGE_ICON,
+    EMBEDDING_BACKEND,
+    INSTRUMENTATION,
+    INSTRUMENTATION_LOG_PATH,
+    INSTRUMENTATION_LOG_BYTES,
+    INSTRUMENTATION_LOG_BACKUPS,
+    apply_custom_css,
+)
+import instrumentation
+
+# Page modules are imported on first visit: (module, render function)
+PAGES = {
+    "home": ("page_modules.home", "show_home_page"),
+    "gallery": ("page_modules.gallery", "show_gallery_page"),
+    "rag": ("page_modules.rag_search", "show_rag_page"),
+    "photos": ("page_modules.photo_gallery", "show_photo_gallery_page"),
+    "admin": ("page_modules.admin", "show_admin_page"),
+}
+
+# Client library each embedding backend imports on its first query
+BACKEND_MODULES = {"openai": "openai", "local": "sentence_transformers"}
 
 # Configure the Streamlit page
 st.set_page_config(
@@ -24,8 +44,63 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+def load_page(page_key):
+    """Import a page module on demand and return its render function."""
+    module_name, function_name = PAGES[page_key]
+    return getattr(importlib.import_module(module_name), function_name)
+
+def warm_up():
+    """Import the other pages and search dependencies, then build the corpus indexes.
+
+    Best effort: anything that fails here fails again, visibly, on the page
+    that needs it.
+    """
+    for module_name in [name for name, _ in PAGES.values()] + [BACKEND_MODULES.get(EMBEDDING_BACKEND)]:
+        try:
+            if module_name:
+                importlib.import_module(module_name)
+        except Exception:
+            pass
+    try:
+        from utils import get_corpus, get_embedding_backend
+        corpus = get_corpus()
+        corpus.facets
+        corpus.lexical_index
+        # Creates the API client or loads the local model before the first search
+        get_embedding_backend()
+    except Exception:
+        pass
+
+@st.cache_resource
+def start_warm_up():
+    """Start the warm-up thread once per server process."""
+    thread = threading.Thread(target=warm_up, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+@st.cache_resource
+def setup_instrumentation():
+    """Start recording spans once per server process, if enabled in the config."""
+    if INSTRUMENTATION != "off":
+        instrumentation.configure(
+            INSTRUMENTATION_LOG_PATH,
+            trace_memory=INSTRUMENTATION == "memory",
+            max_bytes=INSTRUMENTATION_LOG_BYTES,
+            backup_count=INSTRUMENTATION_LOG_BACKUPS
+        )
+    return instrumentation.enabled()
+
 def main():
     """Main application function."""
+    setup_instrumentation()
+    with instrumentation.rerun() as run:
+        render(run)
+    
+    # The first page is already on screen; preload the rest in the background
+    start_warm_up()
+
+def render(run):
+    """Sidebar and selected page of one script run."""
     # Apply custom styling
     apply_custom_css()
     
@@ -51,6 +126,8 @@ def main():
         "🔍 Busca Inteligente": "rag",
         "📷 Galeria de Fotos": "photos"
     }
+    if instrumentation.enabled():
+        page_options["🛠️ Desempenho"] = "admin"
     
     selected_page = st.sidebar.selectbox(
         "Navegação",
@@ -77,15 +154,9 @@ def main():
     
     # Route to the selected page
     page_key = page_options[selected_page]
+    run.page = page_key
     
-    if page_key == "home":
-        show_home_page()
-    elif page_key == "gallery":
-        show_gallery_page()
-    elif page_key == "rag":
-        show_rag_page()
-    elif page_key == "photos":
-        show_photo_gallery_page()
+    load_page(page_key)()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,20 @@
+"""JSON manifests of what a pipeline step already did, written atomically."""
+
+import json
+import os
+
+
+def load_manifest(path, default=None):
+    """The manifest at ``path``, or ``default`` (an empty dict) if missing or unreadable."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {} if default is None else default
+
+
+def save_manifest(path, manifest):
+    """Write ``manifest`` to a temporary file and rename it into place."""
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
@@ -0,0 +1,251 @@
+"""Persistent OCR results: a content-addressed cache and an append-only journal.
+
+Cache entries are keyed by the SHA-256 of the scan's bytes together with the
+model, prompt version and preprocessing settings, so a renamed or
+re-downloaded scan is never sent to the API twice, while a prompt or
+preprocessing change invalidates everything at once.
+The journal records every finished scan as one JSON line as soon as it
+completes; an interrupted run resumes from it and only redoes unfinished
+scans. Downstream stages can ``follow`` the journal while OCR is still
+running, and ``compact`` turns it into ``letters.json`` and ``strange.json``.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+
+DATE_RE = re.compile(r"^\d{2}/\d{2}/\d{4}$")
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 hex digest of the file at ``path``."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def result_key(image_hash, model, variant):
+    """Cache key of one OCR result; ``variant`` names the prompt and preprocessing."""
+    return hashlib.sha256(f"{image_hash}:{model}:{variant}".encode("utf-8")).hexdigest()
+
+
+def is_valid_letter(data):
+    """Whether an OCR result is a dated letter with a usable transcription."""
+    if not data.get("is_letter") or "error" in data:
+        return False
+    text = (data.get("text") or "").strip()
+    return len(text) >= 20 and bool(DATE_RE.match(data.get("date") or ""))
+
+
+def error_record(rel_path, error):
+    """Placeholder written to the strange list for scans that failed."""
+    return {
+        "is_letter": None,
+        "from": None,
+        "to": None,
+        "date": None,
+        "text": None,
+        "image_path": rel_path,
+        "error": error
+    }
+
+
+def _write_json(path, data):
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+class ResultCache:
+    """One JSON file per result under ``cache_dir``, sharded by key prefix."""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """The cached result for ``key``, or None."""
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, result):
+        """Store ``result`` atomically, so readers never see a partial file."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+class Journal:
+    """Append-only JSON Lines log of finished OCR items.
+
+    Each scan entry carries at least ``key``, ``image_path`` and ``status``
+    (``"ok"`` or ``"error"``); an OCR run is bracketed by ``{"event": "start"}``
+    and ``{"event": "end"}``. Lines are flushed as they are written; a line
+    torn by a crash is ignored when the journal is read back.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def entries(self):
+        """Every readable entry, oldest first."""
+        if not os.path.exists(self.path):
+            return []
+        entries = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+        return entries
+
+    def latest(self):
+        """``{key: entry}`` keeping the most recent entry per key."""
+        return {entry["key"]: entry for entry in self.entries() if "key" in entry}
+
+    def follow(self, poll_interval=1.0, idle_timeout=None):
+        """Yield entries from the start of the journal as they are appended.
+
+        Stops at the end of the file once a run has written its ``end``
+        event after following began (``end`` events already in the journal
+        belong to earlier runs), or after ``idle_timeout`` seconds without
+        new lines.
+        """
+        idle = 0.0
+        # Anything before this offset was written before we started following
+        attached_at = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        while not os.path.exists(self.path):
+            if idle_timeout is not None and idle >= idle_timeout:
+                return
+            time.sleep(poll_interval)
+            idle += poll_interval
+
+        ended = False
+        buffer = b""
+        with open(self.path, "rb") as f:
+            while True:
+                if not buffer:
+                    line_start = f.tell()
+                line = f.readline()
+                if not line:
+                    if ended or (idle_timeout is not None and idle >= idle_timeout):
+                        return
+                    time.sleep(poll_interval)
+                    idle += poll_interval
+                    continue
+                idle = 0.0
+                buffer += line
+                # Wait for the writer to finish the line
+                if not buffer.endswith(b"\n"):
+                    continue
+                try:
+                    entry = json.loads(buffer)
+                except ValueError:
+                    continue
+                finally:
+                    buffer = b""
+                event = entry.get("event")
+                if event == "start":
+                    ended = False
+                elif event == "end" and line_start >= attached_at:
+                    ended = True
+                yield entry
+
+    def append(self, entry):
+        """Write one entry and flush it to the OS."""
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            torn = False
+            if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+                with open(self.path, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    torn = f.read(1) != b"\n"
+            self._file = open(self.path, "a", encoding="utf-8")
+            # Terminate a line torn by a previous crash before appending
+            if torn:
+                self._file.write("\n")
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _read_records(path):
+    """Records of an existing ``letters.json``/``strange.json``, or none."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def compact(journal, letters_path, strange_path, paths=None):
+    """Write ``letters.json`` and ``strange.json`` from the journal.
+
+    Journal entries are overlaid on the records already in both files, so
+    scans the journal does not hold keep their transcription. The latest
+    entry per image path wins, except that a failed scan never replaces a
+    transcription. Only ``paths`` are included when given, otherwise every
+    existing record and every journaled scan that still exists. Raises
+    ``ValueError`` when the journal holds no scans, rather than rewriting
+    the files from nothing. Returns ``(letter count, strange count)``.
+    """
+    entries = [entry for entry in journal.entries() if entry.get("status") in ("ok", "error")]
+    if not entries:
+        raise ValueError(f"{journal.path} holds no OCR results; not rewriting {letters_path}")
+
+    records = {}
+    for record in _read_records(strange_path) + _read_records(letters_path):
+        if record.get("image_path"):
+            records[record["image_path"]] = record
+    existing = set(records)
+    for entry in entries:
+        path = entry["image_path"]
+        if entry["status"] == "ok":
+            records[path] = entry["record"]
+        elif path not in records or "error" in records[path]:
+            records[path] = error_record(path, entry.get("error"))
+
+    if paths is None:
+        paths = [path for path in records if path in existing or os.path.exists(path)]
+    letters = []
+    strange = []
+    for path in sorted(paths):
+        record = records.get(path)
+        if record is None:
+            continue
+        (letters if is_valid_letter(record) else strange).append(record)
+
+    _write_json(letters_path, letters)
+    _write_json(strange_path, strange)
+    return len(letters), len(strange)
@@ -0,0 +1,108 @@
+"""Admin page summarizing the instrumentation log (shown only when enabled)."""
+
+import statistics
+import streamlit as st
+from config import (
+    INSTRUMENTATION,
+    INSTRUMENTATION_LOG_PATH,
+)
+from instrumentation import read_log
+from utils import get_query_cache
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def span_summary(records):
+    """One row per span name, over the reruns in ``records``."""
+    by_name = {}
+    for record in records:
+        for name, totals in record["spans"].items():
+            by_name.setdefault(name, []).append(totals)
+    rows = []
+    for name, entries in by_name.items():
+        times = [entry["ms"] for entry in entries]
+        rows.append({
+            "Trecho": name,
+            "Execuções": len(entries),
+            "Chamadas/execução": round(statistics.mean(entry["calls"] for entry in entries), 1),
+            "Mediana (ms)": round(statistics.median(times), 2),
+            "p95 (ms)": round(percentile(times, 0.95), 2),
+            "Máx. (ms)": round(max(entry["max_ms"] for entry in entries), 2),
+            "Alocado (KB)": round(statistics.mean(entry["alloc_kb"] for entry in entries), 1),
+            "Pico (KB)": round(max(entry["peak_kb"] for entry in entries), 1),
+        })
+    rows.sort(key=lambda row: row["p95 (ms)"], reverse=True)
+    return rows
+
+def show_query_cache_stats():
+    """Counters of this server's query-embedding cache."""
+    stats = get_query_cache().stats()
+    st.markdown("### 🧠 Cache de consultas")
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Taxa de acerto", f"{stats['hit_rate']:.0%}")
+    col2.metric("Em memória", f"{stats['size']}/{stats['max_size']}")
+    col3.metric("Em disco", stats["stored"] if stats["stored"] is not None else "—")
+    col4.metric("Lidas do disco", stats["disk_hits"])
+    st.caption(f"{stats['hits']} acertos e {stats['misses']} falhas desde o início do servidor")
+
+def show_admin_page():
+    """Display per-rerun timings and memory recorded by the instrumentation."""
+    st.markdown(
+        """
+        <h1 class='page-header'>🛠️ Desempenho</h1>
+        <p class='page-description'>
+            Tempo e memória de cada execução das páginas, por trecho de código
+        </p>
+        """,
+        unsafe_allow_html=True
+    )
+
+    show_query_cache_stats()
+
+    st.markdown("### 📈 Execuções")
+    limit = st.slider("Últimas execuções:", min_value=50, max_value=5000, value=500, step=50)
+    records = read_log(INSTRUMENTATION_LOG_PATH, limit=limit)
+    if not records:
+        st.info(f"📭 Nenhuma execução registrada ainda em {INSTRUMENTATION_LOG_PATH}")
+        return
+
+    pages = sorted({record["page"] for record in records if record["page"]})
+    page = st.selectbox(
+        "Página:",
+        options=[None] + pages,
+        format_func=lambda p: "Todas" if p is None else p
+    )
+    if page is not None:
+        records = [record for record in records if record["page"] == page]
+    if not records:
+        st.info("📭 Nenhuma execução registrada para esta página")
+        return
+
+    times = [record["ms"] for record in records]
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Execuções", len(records))
+    col2.metric("Mediana", f"{statistics.median(times):.0f} ms")
+    col3.metric("p95", f"{percentile(times, 0.95):.0f} ms")
+    col4.metric("Interrompidas", sum(record["interrupted"] for record in records))
+
+    st.markdown("### ⏱️ Por trecho")
+    if INSTRUMENTATION != "memory":
+        st.caption("Memória não registrada; use INSTRUMENTATION=memory para medir alocações")
+    st.dataframe(span_summary(records), use_container_width=True, hide_index=True)
+
+    st.markdown("### 🕒 Execuções recentes")
+    recent = []
+    for record in reversed(records[-50:]):
+        slowest = max(record["spans"].items(), key=lambda item: item[1]["ms"], default=(None, None))[0]
+        recent.append({
+            "Horário": record["ts"],
+            "Página": record["page"],
+            "Fragmento": record.get("fragment"),
+            "Total (ms)": record["ms"],
+            "Pico (KB)": record["peak_kb"],
+            "Trecho mais lento": slowest,
+            "Interrompida": record["interrupted"],
+        })
+    st.dataframe(recent, use_container_width=True, hide_index=True)
@@ -1,13 +1,11 @@
 """Gallery page for displaying letters."""
 
 import streamlit as st
-from utils import load_letters, show_letter
-from config import apply_custom_css
+from utils import load_letters, page_fragment, show_facet_filters, show_letter
+from instrumentation import span
 
 def show_gallery_page():
     """Display the letters gallery page."""
-    apply_custom_css()
-    
     st.markdown(
         """
         <h1 class='page-header'>📚 Galeria de Cartas</h1>
@@ -18,11 +16,22 @@ def show_gallery_page():
         unsafe_allow_html=True
     )
     
+    show_gallery_letters()
+
+@page_fragment("gallery")
+def show_gallery_letters():
+    """Filters, page selector and letters; changing them reruns only this part."""
     letters = load_letters()
     
+    # Optional filters; None means every letter is shown
+    filtered = show_facet_filters("gallery")
+    total_letters = len(letters) if filtered is None else len(filtered)
+    if total_letters == 0:
+        st.info("🔍 Nenhuma carta corresponde aos filtros selecionados")
+        return
+    
     # Pagination settings
     LETTERS_PER_PAGE = 5
-    total_letters = len(letters)
     total_pages = (total_letters - 1) // LETTERS_PER_PAGE + 1
     
     # Page selector
@@ -51,13 +60,18 @@ def show_gallery_page():
         unsafe_allow_html=True
     )
     
-    # Display letters
-    for i, letter in enumerate(letters[start_idx:end_idx]):
+    # Display letters (only this page's rows are read from the store)
+    with span("gallery.fetch_letters"):
+        if filtered is None:
+            page_letters = letters[start_idx:end_idx]
+        else:
+            page_letters = letters.get_many(filtered[start_idx:end_idx])
+    for i, letter in enumerate(page_letters):
         with st.container():
             show_letter(letter)
             
             # Add some spacing between letters
-            if i < len(letters[start_idx:end_idx]) - 1:
+            if i < len(page_letters) - 1:
                 st.markdown("<div style='margin: 1rem 0;'></div>", unsafe_allow_html=True)
     
     # Navigation help
@@ -1,14 +1,17 @@
 """Home page for the Judith Tribute App."""
 
 import streamlit as st
-import os
-from PIL import Image
-from config import apply_custom_css, PHOTOS_DIR
+from config import (
+    PHOTOS_DIR,
+    HERO_PHOTO,
+    DERIVATIVES_DIR,
+    PHOTO_GRID_WIDTH,
+)
+from image_derivatives import make_derivative
+from utils import load_photo_catalog
 
 def show_home_page():
     """Display the beautiful home page."""
-    apply_custom_css()
-    
     # Main header section with side-by-side layout
     col1, col2 = st.columns([2, 1], gap="large")
     
@@ -31,10 +34,10 @@ def show_home_page():
     
     with col2:
         # Hero image section
-        hero_image_path = os.path.join(PHOTOS_DIR, "IMG_7240.jpg")
-        if os.path.exists(hero_image_path):
+        hero = next((p for p in load_photo_catalog() if p["name"] == HERO_PHOTO), None)
+        if hero:
             try:
-                image = Image.open(hero_image_path)
+                image = make_derivative(hero["path"], PHOTO_GRID_WIDTH, DERIVATIVES_DIR)
                 st.markdown(
                     "<div style='text-align: center; margin-top: 1rem;'>",
                     unsafe_allow_html=True
@@ -42,14 +45,13 @@ def show_home_page():
                 st.image(
                     image,
                     caption="Judith - Uma vida repleta de amor e memórias",
-                    use_container_width=True,
-                    output_format="auto"
+                    use_container_width=True
                 )
                 st.markdown("</div>", unsafe_allow_html=True)
             except Exception as e:
                 st.warning(f"Não foi possível carregar a imagem principal: {e}")
         else:
-            st.info("📸 Imagem principal não encontrada em data/photos/IMG_7240.jpg")
+            st.info(f"📸 Imagem principal não encontrada em {PHOTOS_DIR}/{HERO_PHOTO}")
     
     # Features section
     st.markdown(
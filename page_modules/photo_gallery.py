@@ -1,15 +1,25 @@
 """Photo gallery page for displaying Judith's photos."""
 
 import streamlit as st
-import glob
-import os
-from PIL import Image
-from config import apply_custom_css, PHOTOS_DIR
+from config import (
+    DERIVATIVES_DIR,
+    PHOTO_GRID_WIDTH,
+    PHOTO_FULL_WIDTH,
+)
+from image_derivatives import make_derivative
+from instrumentation import span
+from utils import load_photo_catalog, page_fragment
+
+def photo_caption(photo):
+    """Caption with the file name and, when known, the capture date."""
+    caption = f"📸 {photo['name']}"
+    if photo.get("taken_at"):
+        year, month, day = photo["taken_at"][:10].split("-")
+        caption += f" · {day}/{month}/{year}"
+    return caption
 
 def show_photo_gallery_page():
     """Display the photo gallery page."""
-    apply_custom_css()
-    
     st.markdown(
         """
         <h1 class='page-header'>📷 Galeria de Fotos</h1>
@@ -20,14 +30,15 @@ def show_photo_gallery_page():
         unsafe_allow_html=True
     )
     
-    # Get all photo files
-    exts = ["*.jpg", "*.jpeg", "*.png", "*.heic", "*.JPG", "*.JPEG", "*.PNG", "*.HEIC"]
-    files = []
-    for ext in exts:
-        files += glob.glob(os.path.join(PHOTOS_DIR, ext))
-    files = sorted(list(set(files)))
+    show_photo_grid()
+
+@page_fragment("photos")
+def show_photo_grid():
+    """Page selector and photo grid; paging reruns only this part."""
+    # Photos come from the cached catalog, already sorted by capture date
+    photos = load_photo_catalog()
     
-    if not files:
+    if not photos:
         st.markdown(
             """
             <div style='text-align: center; margin: 3rem 0; padding: 2rem; background: rgba(165, 105, 189, 0.1); border-radius: 20px;'>
@@ -43,10 +54,32 @@ def show_photo_gallery_page():
         )
         return
     
+    # Pagination settings (a multiple of the grid width keeps rows full)
+    PHOTOS_PER_PAGE = 12
+    total_photos = len(photos)
+    total_pages = (total_photos - 1) // PHOTOS_PER_PAGE + 1
+    
+    # Page selector
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
+        page = st.number_input(
+            "Página",
+            min_value=1,
+            max_value=total_pages,
+            value=1,
+            step=1,
+            help=f"Navegue pelas {total_pages} páginas de fotos"
+        )
+    
+    # Only this page's photos are resolved and sent to the browser
+    start_idx = (page - 1) * PHOTOS_PER_PAGE
+    end_idx = min(start_idx + PHOTOS_PER_PAGE, total_photos)
+    page_photos = photos[start_idx:end_idx]
+    
     st.markdown(
         f"""
         <div style='text-align: center; margin: 1rem 0 2rem 0; color: #a569bd; font-size: 1.2em; font-family: Montserrat;'>
-            ✨ {len(files)} fotografias encontradas
+            ✨ Exibindo fotos {start_idx + 1} a {end_idx} de {total_photos} fotografias
         </div>
         """,
         unsafe_allow_html=True
@@ -54,35 +87,24 @@ def show_photo_gallery_page():
     
     # Display photos in a responsive grid
     num_cols = 3
-    for row_start in range(0, len(files), num_cols):
+    for row_start in range(0, len(page_photos), num_cols):
         cols = st.columns(num_cols, gap="medium")
-        for col_idx, img_path in enumerate(files[row_start:row_start + num_cols]):
+        for col_idx, photo in enumerate(page_photos[row_start:row_start + num_cols]):
+            img_path = photo["path"]
             with cols[col_idx]:
                 st.markdown("<div class='photo-card' style='padding: 1rem;'>", unsafe_allow_html=True)
                 try:
-                    if img_path.lower().endswith(".heic"):
-                        try:
-                            from pillow_heif import open_heif
-                            heif_file = open_heif(img_path)
-                            img = Image.frombytes(
-                                heif_file.mode,
-                                heif_file.size,
-                                heif_file.data,
-                                "raw"
+                    # Decoded once (see scripts/build_derivatives.py), then served from cache
+                    with span("photos.derivative"):
+                        derivative = make_derivative(img_path, PHOTO_GRID_WIDTH, DERIVATIVES_DIR)
+                    with span("photos.emit"):
+                        st.image(derivative, caption=photo_caption(photo), use_container_width=True)
+                    if st.toggle("🔍 Tamanho completo", key=f"photo-full-{img_path}"):
+                        with span("photos.full_size"):
+                            st.image(
+                                make_derivative(img_path, PHOTO_FULL_WIDTH, DERIVATIVES_DIR),
+                                use_container_width=True
                             )
-                        except ImportError:
-                            st.warning("⚠️ pillow-heif não instalado. Não é possível exibir arquivos HEIC.")
-                            continue
-                    else:
-                        img = Image.open(img_path)
-                    
-                    # Create a nice frame effect
-                    st.image(
-                        img,
-                        caption=f"📸 {os.path.basename(img_path)}",
-                        use_container_width=True,
-                        output_format="auto"
-                    )
                     
                 except Exception as e:
                     st.markdown(
@@ -90,7 +112,7 @@ def show_photo_gallery_page():
                         <div style='text-align: center; padding: 2rem; background: rgba(255, 0, 0, 0.1); border-radius: 12px; color: #d63384;'>
                             <p style='margin: 0; font-family: Montserrat;'>
                                 ❌ Erro ao carregar<br>
-                                <small>{os.path.basename(img_path)}</small>
+                                <small>{photo["name"]}</small>
                             </p>
                         </div>
                         """,
@@ -107,7 +129,7 @@ def show_photo_gallery_page():
         """
         <div style='text-align: center; margin: 3rem 0 1rem 0; padding: 1.5rem; background: rgba(165, 105, 189, 0.1); border-radius: 16px;'>
             <p style='color: #6c3483; font-family: Montserrat; margin: 0; font-size: 1.1em;'>
-                💡 Clique nas imagens para visualizá-las em tamanho completo
+                💡 Use 🔍 Tamanho completo para ver cada foto em alta resolução
             </p>
         </div>
         """,
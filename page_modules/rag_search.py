@@ -1,15 +1,70 @@
 """RAG search page for intelligent letter search."""
 
 import streamlit as st
-import numpy as np
-import os
-from utils import load_letters, load_embeddings, show_letter
-from config import apply_custom_css
+from utils import (
+    load_letters,
+    load_lexical_index,
+    load_embedding_matrix,
+    load_ann_index,
+    embedding_model,
+    get_embedding_backend,
+    get_query_cache,
+    page_fragment,
+    show_facet_filters,
+    show_letter,
+)
+from config import (
+    SUGGESTED_QUERIES,
+    SEARCH_TOP_K,
+    SEARCH_THRESHOLD,
+    HYBRID_CANDIDATES,
+    HYBRID_SEMANTIC_WEIGHT,
+    HYBRID_PRUNE,
+    RRF_K,
+    ANN_NPROBE,
+)
+from instrumentation import span
+from retrieval import top_k, hybrid_search, rows_for_letters
+
+# Search modes offered on the page
+SEARCH_MODES = {
+    "🔀 Híbrida": "hybrid",
+    "🧠 Semântica": "semantic",
+    "🔤 Palavras-chave": "keyword",
+}
+
+def embed_query(question):
+    """Embed a search query, reusing cached vectors when available.
+
+    The backend (API client or local model) is only created on a cache
+    miss, so cached queries are answered without it.
+    """
+    name, model = embedding_model()
+    cache = get_query_cache()
+    with span("search.embed_query"):
+        vec = cache.get(question, f"{name}:{model}")
+        if vec is None:
+            backend = get_embedding_backend()
+            vec = cache.put(question, f"{backend.name}:{backend.model}", backend.embed_query(question))
+        return vec
+
+def lexical_search(question, k, allowed):
+    """BM25 over the local keyword index, no network needed."""
+    lexical = load_lexical_index()
+    with span("search.keyword"):
+        return lexical.search(question, k=k, allowed=allowed)
+
+def format_score(mode, score):
+    """Human-readable score label for a search result."""
+    if mode == "keyword":
+        return f"Relevância: {score:.1f}"
+    if mode == "hybrid":
+        # 100% means ranked first by both retrievers
+        return f"Relevância: {score * (RRF_K + 1):.0%}"
+    return f"Similaridade: {score:.1%}"
 
 def show_rag_page():
     """Display the RAG search page."""
-    apply_custom_css()
-    
     st.markdown(
         """
         <h1 class='page-header'>🔍 Busca Inteligente</h1>
@@ -35,56 +90,88 @@ def show_rag_page():
         unsafe_allow_html=True
     )
     
+    show_search()
+
+@page_fragment("rag")
+def show_search():
+    """Search box, options and results; a new query reruns only this part."""
     question = st.text_input(
         "Busca:",
         placeholder="Digite o que você quer encontrar nas cartas...",
         help="Use palavras-chave ou frases para encontrar cartas sobre temas específicos"
     )
     
+    selected_mode = st.radio(
+        "Modo de busca:",
+        options=list(SEARCH_MODES.keys()),
+        horizontal=True,
+        help="Híbrida combina as duas; semântica entende temas e sentidos; palavras-chave encontra nomes e termos exatos, sem acesso à internet"
+    )
+    mode = SEARCH_MODES[selected_mode]
+    
+    top_n = st.slider(
+        "Número de resultados:",
+        min_value=5,
+        max_value=50,
+        value=SEARCH_TOP_K,
+        step=5
+    )
+    
+    # Facet filters narrow the candidates before any scoring
+    allowed = show_facet_filters("search")
+    
     if question:
         with st.spinner("🔎 Buscando cartas relevantes..."):
             try:
-                # Load data
-                embeddings = load_embeddings()
                 letters = load_letters()
                 
-                # Get embedding for the question using OpenAI
-                import openai
-                client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-                
-                try:
-                    response = client.embeddings.create(
-                        input=question,
-                        model="text-embedding-3-small"
-                    )
-                    q_emb = np.array(response.data[0].embedding)
-                except Exception as e:
-                    st.error(f"❌ Erro ao gerar embedding da pergunta: {e}")
-                    st.info("💡 Verifique se a variável de ambiente OPENAI_API_KEY está configurada")
-                    return
-                
-                # Compute similarity for all valid embeddings
-                scored = []
-                for i, emb in enumerate(embeddings):
-                    if isinstance(emb, dict) and 'embedding' in emb:
-                        emb_vec = np.array(emb['embedding'])
-                    else:
-                        emb_vec = np.array(emb)
-                    
-                    if emb_vec is None or emb_vec.ndim != 1:
-                        continue
-                    if emb_vec.dtype.kind not in {'f', 'i'}:
-                        continue
-                    if np.any([v is None for v in emb_vec]):
-                        continue
-                    
-                    score = np.dot(q_emb, emb_vec) / (np.linalg.norm(q_emb) * np.linalg.norm(emb_vec))
-                    scored.append((score, i))
-                
-                # Filter and show top 10 relevant letters above threshold
-                threshold = 0.2
-                top = sorted([x for x in scored if x[0] > threshold], reverse=True)[:10]
+                if mode != "keyword":
+                    # Embedding store, ANN index and the question's embedding
+                    # (cached, embedding backend on a miss)
+                    try:
+                        emb_matrix = load_embedding_matrix()
+                        ann = load_ann_index()
+                        q_emb = embed_query(question)
+                    except Exception as e:
+                        if mode != "hybrid":
+                            st.error(f"❌ Busca semântica indisponível: {e}")
+                            st.info("💡 Verifique os embeddings das cartas e a variável OPENAI_API_KEY, use EMBEDDING_BACKEND=local ou a busca por palavras-chave")
+                            return
+                        # Hybrid search degrades to keywords only
+                        st.warning(f"⚠️ Busca semântica indisponível, usando apenas palavras-chave: {e}")
+                        mode = "keyword"
                 
+                if mode == "keyword":
+                    top = lexical_search(question, top_n, allowed)
+                elif mode == "hybrid":
+                    lexical = load_lexical_index()
+                    with span("search.hybrid"):
+                        top = hybrid_search(
+                            emb_matrix,
+                            q_emb,
+                            lexical,
+                            question,
+                            k=top_n,
+                            threshold=SEARCH_THRESHOLD,
+                            candidates=HYBRID_CANDIDATES,
+                            semantic_weight=HYBRID_SEMANTIC_WEIGHT,
+                            prune=HYBRID_PRUNE,
+                            rrf_k=RRF_K,
+                            ann=ann,
+                            nprobe=ANN_NPROBE,
+                            allowed=allowed
+                        )
+                else:
+                    with span("search.semantic"):
+                        # Score the filtered letters, the ANN candidates or everything in one pass
+                        if allowed is not None:
+                            rows = rows_for_letters(emb_matrix, allowed)
+                        elif ann:
+                            rows = ann.candidate_rows(q_emb, ANN_NPROBE)
+                        else:
+                            rows = None
+                        top = top_k(emb_matrix, q_emb, k=top_n, threshold=SEARCH_THRESHOLD, rows=rows)
+            
                 if top:
                     st.markdown(
                         f"""
@@ -97,19 +184,21 @@ def show_rag_page():
                         unsafe_allow_html=True
                     )
                     
-                    for i, (score, idx) in enumerate(top):
+                    with span("search.fetch_letters"):
+                        top_letters = letters.get_many([idx for _, idx in top])
+                    for i, ((score, idx), letter) in enumerate(zip(top, top_letters)):
                         st.markdown(
                             f"""
                             <div style='margin: 2rem 0 1rem 0;'>
                                 <h4 style='color: #6c3483; font-family: Montserrat;'>
                                     📄 Carta {i + 1} 
-                                    <span class='similarity-score'>Similaridade: {score:.1%}</span>
+                                    <span class='similarity-score'>{format_score(mode, score)}</span>
                                 </h4>
                             </div>
                             """,
                             unsafe_allow_html=True
                         )
-                        show_letter(letters[idx])
+                        show_letter(letter)
                 else:
                     st.markdown(
                         """
@@ -130,19 +219,17 @@ def show_rag_page():
                 st.info("💡 Verifique se todos os arquivos de dados estão disponíveis")
     else:
         # Show example queries when no question is entered
+        suggestions = "\n".join(
+            f"<li>\"{query}\"</li>" for query in SUGGESTED_QUERIES
+        )
         st.markdown(
-            """
+            f"""
             <div style='margin: 2rem 0; padding: 2rem; background: linear-gradient(135deg, #fff8f0 0%, #f8f1ff 100%); border-radius: 20px;'>
                 <h4 style='color: #6c3483; font-family: Montserrat; margin-bottom: 1rem;'>
                     💡 Sugestões de perguntas:
                 </h4>
                 <ul style='color: #4d3c4c; font-family: Montserrat; font-size: 1.1em; line-height: 1.8;'>
-                    <li>"Cartas sobre aniversários ou celebrações"</li>
-                    <li>"Mensagens de amigos da infância"</li>
-                    <li>"Cartas recebidas durante os feriados"</li>
-                    <li>"Correspondências sobre trabalho ou carreira"</li>
-                    <li>"Mensagens de apoio e encorajamento"</li>
-                    <li>"Cartas de familiares distantes"</li>
+                    {suggestions}
                 </ul>
             </div>
             """,
@@ -0,0 +1,49 @@
+"""Rasterize multi-page PDF scans into one JPEG per page.
+
+Each page is rendered on its own (``first_page``/``last_page``), so a
+worker never holds more than one page in memory and pages of one PDF can be
+spread across processes. A manifest records the SHA-256 of every PDF that
+was rasterized; PDFs whose hash, DPI and pages are unchanged are skipped.
+"""
+
+import os
+import tempfile
+
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+
+def page_path(pdf_path, page, output_dir):
+    """Image path of ``page`` (1-based) of ``pdf_path``, e.g. ``SCAN 01_page1.jpg``."""
+    stem = os.path.splitext(os.path.basename(pdf_path))[0]
+    return os.path.join(output_dir, f"{stem}_page{page}.jpg")
+
+
+def page_count(pdf_path):
+    """Number of pages in ``pdf_path``."""
+    return int(pdfinfo_from_path(pdf_path)["Pages"])
+
+
+def rasterize_page(pdf_path, page, output_dir, dpi=300, quality=90):
+    """Render one page to JPEG, written atomically; return its path."""
+    path = page_path(pdf_path, page, output_dir)
+    image = convert_from_path(pdf_path, dpi=dpi, first_page=page, last_page=page)[0]
+    fd, tmp_path = tempfile.mkstemp(dir=output_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            image.convert("RGB").save(f, format="JPEG", quality=quality)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return path
+
+
+def is_current(entry, source_hash, dpi, output_dir):
+    """Whether a manifest entry still describes the PDF and its pages exist."""
+    return (
+        entry is not None
+        and entry.get("sha256") == source_hash
+        and entry.get("dpi") == dpi
+        and all(os.path.exists(os.path.join(output_dir, name)) for name in entry.get("pages", []))
+    )
@@ -0,0 +1,127 @@
+"""Manifest of the photo collection.
+
+The catalog lists every photo with its path, size, dimensions, mtime and
+EXIF capture date, sorted by capture date. It is built with a single
+``os.scandir`` pass and saved to a JSON manifest that is reused until the
+photo folder's mtime changes (a photo was added, removed or renamed).
+"""
+
+import json
+import os
+import tempfile
+
+from PIL import Image
+
+try:
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+except ImportError:
+    pass
+
+PHOTO_EXTENSIONS = (".jpg", ".jpeg", ".png", ".heic")
+
+EXIF_IFD = 0x8769
+EXIF_DATETIME_ORIGINAL = 36867
+EXIF_DATETIME = 306
+EXIF_ORIENTATION = 274
+
+
+def _capture_date(exif):
+    """ISO capture timestamp from EXIF data, or None."""
+    raw = exif.get_ifd(EXIF_IFD).get(EXIF_DATETIME_ORIGINAL) or exif.get(EXIF_DATETIME)
+    if not raw:
+        return None
+    try:
+        date, time = str(raw).strip().split(" ", 1)
+        return f"{date.replace(':', '-')}T{time}"
+    except ValueError:
+        return None
+
+
+def describe_photo(path, stat):
+    """Catalog entry for one photo; only the image header is read."""
+    entry = {
+        "name": os.path.basename(path),
+        "path": path,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+        "width": None,
+        "height": None,
+        "taken_at": None,
+    }
+    try:
+        with Image.open(path) as img:
+            exif = img.getexif()
+            width, height = img.size
+            # Orientations 5-8 are stored rotated by 90 degrees
+            if exif.get(EXIF_ORIENTATION) in (5, 6, 7, 8):
+                width, height = height, width
+            entry.update(width=width, height=height, taken_at=_capture_date(exif))
+    except Exception:
+        # Unreadable files stay listed so the gallery can report them
+        pass
+    return entry
+
+
+def _sort_key(entry):
+    """Capture date first (undated photos last), then file name."""
+    return (entry["taken_at"] is None, entry["taken_at"] or "", entry["name"])
+
+
+def scan_photos(photos_dir, previous=None):
+    """Describe every photo in ``photos_dir`` in one directory pass.
+
+    Entries in ``previous`` whose size and mtime are unchanged are reused
+    without reopening the file.
+    """
+    known = {entry["path"]: entry for entry in previous or []}
+    photos = []
+    with os.scandir(photos_dir) as it:
+        for dir_entry in it:
+            if not dir_entry.is_file() or not dir_entry.name.lower().endswith(PHOTO_EXTENSIONS):
+                continue
+            stat = dir_entry.stat()
+            cached = known.get(dir_entry.path)
+            if cached and (cached["size"], cached["mtime"]) == (stat.st_size, stat.st_mtime_ns):
+                photos.append(cached)
+            else:
+                photos.append(describe_photo(dir_entry.path, stat))
+    photos.sort(key=_sort_key)
+    return photos
+
+
+def load_catalog(photos_dir, manifest_path):
+    """Return the photo catalog, rescanning only if the folder changed."""
+    if not os.path.isdir(photos_dir):
+        return []
+    dir_mtime = os.stat(photos_dir).st_mtime_ns
+
+    manifest = None
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = None
+    if manifest and manifest.get("photos_dir") == photos_dir:
+        if manifest.get("dir_mtime") == dir_mtime:
+            return manifest["photos"]
+        photos = scan_photos(photos_dir, manifest["photos"])
+    else:
+        photos = scan_photos(photos_dir)
+
+    try:
+        directory = os.path.dirname(manifest_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(
+                {"photos_dir": photos_dir, "dir_mtime": dir_mtime, "photos": photos},
+                f,
+                ensure_ascii=False
+            )
+        os.replace(tmp_path, manifest_path)
+    except OSError:
+        # A read-only deployment still gets the freshly scanned catalog
+        pass
+    return photos
@@ -0,0 +1,144 @@
+"""Minimal dependency-graph runner for the ingest stages.
+
+A stage declares the files it reads and writes and the stages it depends
+on. A stage runs once all its dependencies have finished, concurrently with
+any other ready stage. It is skipped when the content hash of its inputs
+matches the previous run and all its outputs still exist. File hashes are
+cached by size and modification time, so unchanged files are not re-read.
+"""
+
+import hashlib
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, NamedTuple, Tuple
+
+from manifest import load_manifest, save_manifest
+
+
+class Stage(NamedTuple):
+    """One ingest step.
+
+    ``inputs`` and ``outputs`` are paths; a directory stands for every file
+    below it. ``always`` stages (such as a remote sync, whose real input is
+    not on disk) run on every invocation.
+    """
+
+    name: str
+    run: Callable[[], None]
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    deps: Tuple[str, ...] = ()
+    always: bool = False
+
+
+class StageResult(NamedTuple):
+    name: str
+    status: str  # "ran", "skipped", "failed" or "blocked"
+    seconds: float
+    error: str = None
+
+
+def _walk(path):
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                yield os.path.join(root, name)
+    elif os.path.exists(path):
+        yield path
+
+
+class HashCache:
+    """SHA-256 of files, remembered by path, size and mtime."""
+
+    def __init__(self, entries=None):
+        self.entries = entries or {}
+
+    def file_hash(self, path):
+        stat = os.stat(path)
+        stamp = [stat.st_size, stat.st_mtime_ns]
+        cached = self.entries.get(path)
+        if cached is not None and cached[:2] == stamp:
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        self.entries[path] = stamp + [digest.hexdigest()]
+        return digest.hexdigest()
+
+    def digest(self, paths):
+        """One hash over the names and contents of every file under ``paths``."""
+        digest = hashlib.sha256()
+        for path in paths:
+            for file_path in _walk(path):
+                digest.update(f"{file_path}\0{self.file_hash(file_path)}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+
+def run_pipeline(stages, state_path, workers=4, force=()):
+    """Run ``stages`` in dependency order and return a ``StageResult`` per stage.
+
+    Stages named in ``force`` run even if their inputs are unchanged. When a
+    stage fails, the stages that depend on it are reported as blocked.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        missing = [dep for dep in stage.deps if dep not in by_name]
+        if missing:
+            raise ValueError(f"stage {stage.name} depends on unknown stages {missing}")
+
+    state = load_manifest(state_path, {"stages": {}, "hashes": {}})
+    hashes = HashCache(state.get("hashes"))
+    results = {}
+
+    def execute(stage):
+        start = time.perf_counter()
+        digest = hashes.digest(stage.inputs)
+        previous = state["stages"].get(stage.name)
+        if (
+            not stage.always
+            and stage.name not in force
+            and previous == digest
+            and all(os.path.exists(path) for path in stage.outputs)
+        ):
+            return StageResult(stage.name, "skipped", time.perf_counter() - start)
+        try:
+            stage.run()
+        except Exception as e:
+            return StageResult(stage.name, "failed", time.perf_counter() - start, str(e))
+        # Record the inputs as they were when the stage started
+        state["stages"][stage.name] = digest
+        return StageResult(stage.name, "ran", time.perf_counter() - start)
+
+    pending = list(stages)
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            changed = True
+            while changed:
+                changed = False
+                for stage in list(pending):
+                    dep_status = [results[dep].status if dep in results else None for dep in stage.deps]
+                    if any(status in ("failed", "blocked") for status in dep_status):
+                        results[stage.name] = StageResult(stage.name, "blocked", 0.0)
+                    elif all(status is not None for status in dep_status):
+                        running[pool.submit(execute, stage)] = stage
+                    else:
+                        continue
+                    pending.remove(stage)
+                    changed = True
+            if not running:
+                if pending:
+                    raise ValueError(f"dependency cycle among {[stage.name for stage in pending]}")
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                results[stage.name] = future.result()
+            # Persist progress so an interrupted ingest keeps finished stages;
+            # dict copies are atomic, other stages may still be hashing
+            save_manifest(state_path, {"stages": dict(state["stages"]), "hashes": dict(hashes.entries)})
+
+    return [results[stage.name] for stage in stages]
@@ -0,0 +1,161 @@
+"""Bounded, persistent cache for search query embeddings.
+
+Entries are keyed on the embedding model and the normalized query text.
+A small in-process LRU answers repeat queries without touching disk; a
+SQLite file keeps them across restarts and is shared by every Streamlit
+worker on the machine. Memory hits refresh the entry's ``last_used`` on disk
+in batches, so eviction there follows actual use rather than first load.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+
+def normalize_query(text):
+    """Canonical form of a query: NFC, case-folded, single-spaced."""
+    return " ".join(unicodedata.normalize("NFC", text).casefold().split())
+
+
+class QueryEmbeddingCache:
+    """LRU cache of query embeddings with optional SQLite persistence.
+
+    ``last_used`` of memory hits is written to disk once ``touch_batch``
+    hits are pending or ``touch_interval`` seconds have passed, and always
+    before evicting from disk.
+    """
+
+    def __init__(self, path=None, max_size=1024, touch_batch=32, touch_interval=30.0):
+        self.max_size = max_size
+        self.touch_batch = touch_batch
+        self.touch_interval = touch_interval
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._touched = {}
+        self._last_flush = time.monotonic()
+        self._db = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings ("
+                " model TEXT NOT NULL,"
+                " query TEXT NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " last_used REAL NOT NULL,"
+                " PRIMARY KEY (model, query))"
+            )
+            self._db.commit()
+
+    def get(self, text, model):
+        """Return the cached vector for ``text`` or None on a miss."""
+        key = (model, normalize_query(text))
+        with self._lock:
+            vec = self._memory.get(key)
+            if vec is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                if self._db is not None:
+                    self._touched[key] = time.time()
+                    if (
+                        len(self._touched) >= self.touch_batch
+                        or time.monotonic() - self._last_flush >= self.touch_interval
+                    ):
+                        self._flush_touches()
+                        self._db.commit()
+                return vec
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT vector FROM query_embeddings WHERE model = ? AND query = ?",
+                    key
+                ).fetchone()
+                if row is not None:
+                    vec = np.frombuffer(row[0], dtype=np.float32)
+                    self._db.execute(
+                        "UPDATE query_embeddings SET last_used = ? WHERE model = ? AND query = ?",
+                        (time.time(), *key)
+                    )
+                    self._db.commit()
+                    self._remember(key, vec)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return vec
+
+            self.misses += 1
+            return None
+
+    def put(self, text, model, vector):
+        """Store ``vector`` for ``text`` in memory and on disk."""
+        key = (model, normalize_query(text))
+        vec = np.asarray(vector, dtype=np.float32)
+        vec.flags.writeable = False
+        with self._lock:
+            self._remember(key, vec)
+            if self._db is not None:
+                self._flush_touches()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO query_embeddings VALUES (?, ?, ?, ?)",
+                    (*key, vec.tobytes(), time.time())
+                )
+                self._db.execute(
+                    "DELETE FROM query_embeddings WHERE rowid IN ("
+                    " SELECT rowid FROM query_embeddings"
+                    " ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_size,)
+                )
+                self._db.commit()
+        return vec
+
+    def get_or_compute(self, text, model, compute):
+        """Return the cached vector, calling ``compute()`` to fill a miss."""
+        vec = self.get(text, model)
+        if vec is None:
+            vec = self.put(text, model, compute())
+        return vec
+
+    def stats(self):
+        """Hit/miss counters and current sizes, for sizing the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            stored = None
+            if self._db is not None:
+                self._flush_touches()
+                self._db.commit()
+                stored = self._db.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._memory),
+                "stored": stored,
+                "max_size": self.max_size,
+            }
+
+    def _flush_touches(self):
+        """Write pending ``last_used`` updates of memory hits; the caller commits."""
+        if self._touched:
+            self._db.executemany(
+                "UPDATE query_embeddings SET last_used = ? WHERE model = ? AND query = ?",
+                [(used, *key) for key, used in self._touched.items()]
+            )
+            self._touched.clear()
+        self._last_flush = time.monotonic()
+
+    def _remember(self, key, vec):
+        """Insert into the in-memory LRU, evicting the oldest entry if full."""
+        self._memory[key] = vec
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
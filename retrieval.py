@@ -0,0 +1,172 @@
+"""Vector retrieval helpers for the intelligent search page."""
+
+from typing import NamedTuple
+
+import numpy as np
+
+
+class EmbeddingMatrix(NamedTuple):
+    """Letter embeddings packed for fast cosine scoring.
+
+    ``matrix`` holds one L2-normalized float32 row per letter that has a
+    usable embedding, ``valid`` flags those letters and ``row_to_letter``
+    maps each matrix row back to its position in ``load_letters()``.
+    """
+
+    matrix: np.ndarray
+    valid: np.ndarray
+    row_to_letter: np.ndarray
+
+
+def _as_vector(item):
+    """Return an embedding as a 1-D float32 array, or None if unusable."""
+    if isinstance(item, dict):
+        item = item.get("embedding")
+    if item is None:
+        return None
+    try:
+        vec = np.asarray(item, dtype=np.float32)
+    except (TypeError, ValueError):
+        # Raised for vectors containing None or non-numeric entries
+        return None
+    if vec.ndim != 1 or vec.size == 0 or not np.all(np.isfinite(vec)):
+        return None
+    return vec
+
+
+def build_embedding_matrix(embeddings):
+    """Pack raw embeddings (dicts or lists) into an ``EmbeddingMatrix``.
+
+    Rows with missing, malformed, zero-length or mismatched-dimension
+    vectors are skipped and marked invalid.
+    """
+    valid = np.zeros(len(embeddings), dtype=bool)
+    rows = []
+    dim = None
+    for i, item in enumerate(embeddings):
+        vec = _as_vector(item)
+        if vec is None:
+            continue
+        if dim is None:
+            dim = vec.size
+        elif vec.size != dim:
+            continue
+        norm = np.linalg.norm(vec)
+        if norm == 0:
+            continue
+        rows.append(vec / norm)
+        valid[i] = True
+
+    if rows:
+        matrix = np.vstack(rows).astype(np.float32, copy=False)
+    else:
+        matrix = np.empty((0, dim or 0), dtype=np.float32)
+    return EmbeddingMatrix(
+        matrix=matrix,
+        valid=valid,
+        row_to_letter=np.flatnonzero(valid),
+    )
+
+
+def normalize(vector):
+    """Return ``vector`` as a unit-length float32 array."""
+    vec = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+def rows_for_letters(emb_matrix, letter_indices):
+    """Matrix rows of the given letters, skipping letters without embeddings."""
+    lookup = np.full(emb_matrix.valid.size, -1, dtype=np.int64)
+    lookup[emb_matrix.row_to_letter] = np.arange(emb_matrix.row_to_letter.size)
+    rows = lookup[np.asarray(letter_indices, dtype=np.int64)]
+    return rows[rows >= 0]
+
+
+def top_k(emb_matrix, query_vec, k=10, threshold=None, rows=None):
+    """Score letters against ``query_vec`` and return the best ``k``.
+
+    Returns a list of ``(score, letter_index)`` tuples sorted by descending
+    cosine similarity, keeping only scores above ``threshold`` if given.
+    With ``rows``, only those matrix rows are scored.
+    """
+    if emb_matrix.matrix.shape[0] == 0 or k <= 0:
+        return []
+
+    if rows is None:
+        rows = np.arange(emb_matrix.matrix.shape[0])
+        scores = emb_matrix.matrix @ normalize(query_vec)
+    else:
+        rows = np.asarray(rows, dtype=np.int64)
+        scores = emb_matrix.matrix[rows] @ normalize(query_vec)
+
+    candidates = np.arange(scores.size)
+    if threshold is not None:
+        candidates = np.flatnonzero(scores > threshold)
+    if candidates.size > k:
+        part = np.argpartition(-scores[candidates], k - 1)[:k]
+        candidates = candidates[part]
+    order = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+    return [
+        (float(scores[i]), int(emb_matrix.row_to_letter[rows[i]]))
+        for i in order
+    ]
+
+
+def reciprocal_rank_fusion(rankings, weights=None, k=60):
+    """Fuse ranked ``(score, letter_index)`` lists with reciprocal-rank fusion.
+
+    Each list contributes ``weight / (k + rank)`` per letter; the result is
+    sorted by fused score.
+    """
+    weights = weights or [1.0] * len(rankings)
+    fused = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, (_, letter_idx) in enumerate(ranking, start=1):
+            fused[letter_idx] = fused.get(letter_idx, 0.0) + weight / (k + rank)
+    return sorted(
+        ((score, letter_idx) for letter_idx, score in fused.items()),
+        key=lambda item: (-item[0], item[1])
+    )
+
+
+def hybrid_search(
+    emb_matrix,
+    query_vec,
+    lexical_index,
+    query,
+    k=10,
+    threshold=None,
+    candidates=100,
+    semantic_weight=0.5,
+    prune=False,
+    rrf_k=60,
+    ann=None,
+    nprobe=32,
+    allowed=None,
+):
+    """Rank letters by fusing BM25 and cosine similarity.
+
+    Both retrievers return up to ``candidates`` letters, which are fused
+    with weighted reciprocal-rank fusion. With ``prune=True`` and enough
+    keyword matches, only the keyword candidates are scored against the
+    embedding matrix, which skips the full O(N·d) scan. Otherwise an
+    ``ann`` index, if given, limits scoring to its ``nprobe`` closest lists.
+    ``allowed`` (sorted letter positions) pre-filters both retrievers.
+    """
+    lexical = lexical_index.search(query, k=candidates, allowed=allowed)
+    rows = None
+    if prune and len(lexical) >= k:
+        rows = rows_for_letters(emb_matrix, [letter_idx for _, letter_idx in lexical])
+    elif allowed is not None:
+        rows = rows_for_letters(emb_matrix, allowed)
+    elif ann is not None:
+        rows = ann.candidate_rows(query_vec, nprobe)
+    semantic = top_k(emb_matrix, query_vec, k=candidates, threshold=threshold, rows=rows)
+    fused = reciprocal_rank_fusion(
+        [semantic, lexical],
+        weights=[semantic_weight, 1.0 - semantic_weight],
+        k=rrf_k
+    )
+    return fused[:k]
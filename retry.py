@@ -0,0 +1,32 @@
+"""Retrying flaky remote calls with exponential backoff."""
+
+import random
+import time
+
+
+def retry_delay(error, attempt):
+    """Seconds to wait before retrying, honouring Retry-After on rate limits."""
+    response = getattr(error, "response", None)
+    retry_after = getattr(response, "headers", {}).get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return min(60.0, 2 ** attempt) + random.uniform(0, 1)
+
+
+def with_backoff(fn, max_retries, label="Call", log=print):
+    """Return ``fn()``, retrying up to ``max_retries`` times on any exception.
+
+    Each retry is reported through ``log``; the last error is re-raised.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            delay = retry_delay(e, attempt)
+            log(f"{label} failed ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
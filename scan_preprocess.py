@@ -0,0 +1,146 @@
+"""Shrink letter scans before they are sent to the OCR model.
+
+Scans are decoded at reduced scale, optionally converted to grayscale,
+cropped to the written area and downsampled to a target long edge. The
+written area is located on a small preview first, so the reduced decode
+still leaves the cropped part at the target size. The JPEG quality is then
+chosen by binary search as the highest that fits a byte budget; if even the
+lowest quality does not fit, the image is shrunk further. Scans that are already small JPEGs are sent unchanged.
+"""
+
+from io import BytesIO
+from typing import NamedTuple, Optional
+import os
+
+import numpy as np
+from PIL import Image, ImageOps
+
+MIN_QUALITY = 40
+MAX_QUALITY = 85
+# Long edge of the preview used to locate the written area before decoding
+PREVIEW_EDGE = 512
+
+
+class PreparedScan(NamedTuple):
+    """JPEG bytes ready for upload plus what was done to produce them."""
+
+    data: bytes
+    original_bytes: int
+    width: int
+    height: int
+    quality: Optional[int]
+
+    @property
+    def bytes_saved(self):
+        return self.original_bytes - len(self.data)
+
+
+def content_box(img, threshold=40, min_fraction=0.005, padding=0.02):
+    """Bounding box of the pixels that differ from the page background.
+
+    The background tone is the median of the border pixels. Rows and columns
+    need at least ``min_fraction`` differing pixels to count, which ignores
+    dust and scanner noise. Returns None when nothing stands out.
+    """
+    gray = np.asarray(img.convert("L"), dtype=np.int16)
+    border = np.concatenate([gray[0], gray[-1], gray[:, 0], gray[:, -1]])
+    mask = np.abs(gray - int(np.median(border))) > threshold
+    rows = np.flatnonzero(mask.mean(axis=1) > min_fraction)
+    cols = np.flatnonzero(mask.mean(axis=0) > min_fraction)
+    if not rows.size or not cols.size:
+        return None
+    pad_y = int(gray.shape[0] * padding)
+    pad_x = int(gray.shape[1] * padding)
+    return (
+        max(0, cols[0] - pad_x),
+        max(0, rows[0] - pad_y),
+        min(gray.shape[1], cols[-1] + 1 + pad_x),
+        min(gray.shape[0], rows[-1] + 1 + pad_y),
+    )
+
+
+def _encode(img, quality):
+    buffer = BytesIO()
+    img.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def fit_to_budget(img, max_bytes, min_quality=MIN_QUALITY, max_quality=MAX_QUALITY):
+    """Encode ``img`` as JPEG within ``max_bytes``; return ``(data, quality, img)``."""
+    while True:
+        lo, hi = min_quality, max_quality
+        best = None
+        while lo <= hi:
+            quality = (lo + hi) // 2
+            data = _encode(img, quality)
+            if len(data) <= max_bytes:
+                best = (data, quality)
+                lo = quality + 1
+            else:
+                hi = quality - 1
+        if best is not None:
+            return best[0], best[1], img
+        if max(img.size) <= 512:
+            # Give up shrinking; a legible scan matters more than the budget
+            return data, min_quality, img
+        img = img.resize((round(img.width * 0.8), round(img.height * 0.8)), Image.LANCZOS)
+
+
+def _decode(src, mode, scale):
+    """Decode ``src`` upright in ``mode``, at no less than ``scale`` of its size.
+
+    JPEGs are decoded directly at 1/2, 1/4 or 1/8 scale when that still
+    meets ``scale``; other formats are decoded at full size.
+    """
+    with Image.open(src) as img:
+        if scale < 1:
+            img.draft(mode, (round(img.width * scale), round(img.height * scale)))
+        return ImageOps.exif_transpose(img).convert(mode)
+
+
+def prepare_scan(src, long_edge=1600, max_bytes=300_000, grayscale=True, crop=True):
+    """Return a ``PreparedScan`` of ``src`` for upload to the OCR model.
+
+    ``max_bytes`` bounds the binary JPEG; base64 adds a third on the wire.
+    """
+    mode = "L" if grayscale else "RGB"
+    original_bytes = os.path.getsize(src)
+    with Image.open(src) as img:
+        source_format = img.format
+        source_size = img.size
+    # Long edge, in source pixels, of the part of the scan that is kept
+    kept_edge = max(source_size)
+    if crop:
+        # Find the written area on a small preview first, so the full decode
+        # below can still be scaled down without shrinking the cropped text
+        preview = _decode(src, mode, PREVIEW_EDGE / max(source_size))
+        box = content_box(preview)
+        if box is not None:
+            kept_edge = max(box[2] - box[0], box[3] - box[1]) * max(source_size) / max(preview.size)
+    img = _decode(src, mode, long_edge / kept_edge)
+
+    if crop:
+        box = content_box(img)
+        if box is not None:
+            img = img.crop(box)
+    if max(img.size) > long_edge:
+        scale = long_edge / max(img.size)
+        img = img.resize((round(img.width * scale), round(img.height * scale)), Image.LANCZOS)
+
+    data, quality, img = fit_to_budget(img, max_bytes)
+    if (
+        source_format == "JPEG"
+        and original_bytes <= min(len(data), max_bytes)
+        and max(source_size) <= long_edge
+    ):
+        # Re-encoding would only make this scan larger
+        with open(src, "rb") as f:
+            data = f.read()
+        return PreparedScan(data, original_bytes, source_size[0], source_size[1], None)
+    return PreparedScan(
+        data=data,
+        original_bytes=original_bytes,
+        width=img.width,
+        height=img.height,
+        quality=quality,
+    )
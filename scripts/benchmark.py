@@ -0,0 +1,470 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import zlib
+import numpy as np
+from PIL import Image, ImageDraw
+from tqdm import tqdm
+from streamlit import config as streamlit_config, logger as streamlit_logger
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import (
+    LETTERS_PATH,
+    LETTERS_DB_PATH,
+    LEXICAL_INDEX_PATH,
+    EMBEDDINGS_MATRIX_PATH,
+    IMAGES_DIR,
+    PHOTOS_DIR,
+    PHOTO_MANIFEST_PATH,
+    DERIVATIVES_DIR,
+    QUERY_CACHE_PATH,
+    ANN_MIN_ROWS,
+    ANN_NPROBE,
+    SEARCH_THRESHOLD,
+    HYBRID_CANDIDATES,
+    HYBRID_SEMANTIC_WEIGHT,
+    HYBRID_PRUNE,
+    RRF_K,
+)
+import embedding_backends
+import utils
+from ann_index import IVFIndex, ann_path_for
+from embedding_store import save_embedding_store, text_hash
+from letter_store import build_letter_store
+from lexical_index import LexicalIndex
+from photo_catalog import EXIF_IFD, EXIF_DATETIME_ORIGINAL, load_catalog
+from retrieval import top_k, hybrid_search
+from utils import (
+    show_letter,
+    load_letters,
+    load_embeddings,
+    load_embedding_matrix,
+    load_lexical_index,
+    load_ann_index,
+    load_photo_catalog,
+)
+from page_modules.rag_search import embed_query
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS_FORMAT = 1  # Bump when the generated layout changes, to regenerate old corpora
+
+# Letters mostly use the words of one theme, so themed queries find them
+THEMES = {
+    "família": "família filhos netos irmã mãe pai casa almoço domingo saudade abraço primos",
+    "aniversário": "aniversário parabéns festa bolo presente velas alegria comemorar idade feliz",
+    "viagem": "viagem praia mar montanha hotel estrada passeio férias fotos paisagem trem",
+    "escola": "escola professora alunos aula livros lição caderno recreio prova formatura",
+    "saúde": "saúde médico hospital remédio melhoras descanso cuidado força recuperação",
+    "natal": "natal presépio ceia presentes árvore família noite estrela missa ano novo",
+    "trabalho": "trabalho escritório chefe projeto reunião salário colegas cidade mudança",
+    "infância": "infância brincadeiras quintal bicicleta boneca rua vizinhos lembranças avó",
+    "casamento": "casamento noivos igreja vestido festa convidados dança alianças lua mel",
+    "música": "música piano canções coral violão concerto disco ouvir cantar teatro",
+}
+COMMON_WORDS = (
+    "querida judith espero que você esteja bem aqui todos estão bem muito obrigada "
+    "pela carta sempre lembro de você com carinho um beijo grande até breve com amor"
+).split()
+SENDERS = [
+    "Ana", "Beatriz", "Carlos", "Daniel", "Eduardo", "Fernanda", "Gabriela", "Helena",
+    "Isabel", "João", "Laura", "Marcos", "Natália", "Otávio", "Paulo", "Regina",
+    "Sofia", "Tereza", "Vera", "Zélia",
+]
+RECIPIENTS = ["Judith", "Judith", "Judith", "Judy", "Família"]
+QUERIES = [
+    "cartas sobre família e saudade",
+    "mensagens de aniversário",
+    "lembranças da infância na casa da avó",
+    "viagem para a praia nas férias",
+    "votos de melhoras e saúde",
+    "festa de casamento na igreja",
+    "noite de natal com a família",
+    "aulas de piano e música",
+]
+
+def word_vector(word, dim):
+    """Fixed pseudo-random unit vector for one word."""
+    rng = np.random.default_rng(zlib.crc32(word.encode("utf-8")))
+    vector = rng.standard_normal(dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+def embed_words(words, dim):
+    """Hashed bag-of-words embedding; texts sharing words point the same way."""
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in words:
+        vector += word_vector(word, dim)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+class StubBackend:
+    """Offline stand-in for the embedding API: deterministic, instant, no network."""
+
+    name = "benchmark"
+
+    def __init__(self, model=None):
+        self.model = model or "hashed-words-384"
+        self.dim = int(self.model.rsplit("-", 1)[1])
+
+    def embed_documents(self, texts):
+        return np.vstack([embed_words(text.lower().split(), self.dim) for text in texts])
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+def fake_scan(path, seed, size=(1600, 2200)):
+    """A letter-sized grayscale page with lines of 'handwriting'."""
+    rng = np.random.default_rng(seed)
+    img = Image.new("L", size, 235)
+    draw = ImageDraw.Draw(img)
+    for y in range(200, size[1] - 200, 70):
+        x = 150
+        while x < size[0] - 250:
+            width = int(rng.integers(40, 160))
+            draw.line([(x, y), (x + width, y + int(rng.integers(-6, 6)))], fill=40, width=4)
+            x += width + 30
+    img.save(path, "JPEG", quality=85)
+
+def fake_photo(path, seed, taken_at, size=(2400, 1800)):
+    """A colourful photo-sized image with an EXIF capture date."""
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 255, (size[1] // 100, size[0] // 100, 3), dtype=np.uint8)
+    img = Image.fromarray(small).resize(size, Image.BILINEAR)
+    exif = Image.Exif()
+    exif.get_ifd(EXIF_IFD)[EXIF_DATETIME_ORIGINAL] = taken_at
+    img.save(path, "JPEG", quality=85, exif=exif.tobytes())
+
+def link_copies(template, paths):
+    """Materialize ``paths`` as hard links to ``template`` (copies where links fail)."""
+    for path in paths:
+        try:
+            os.link(template, path)
+        except OSError:
+            shutil.copyfile(template, path)
+
+def generate_corpus(root, n_letters, n_photos, dim, seed=0):
+    """Write a synthetic archive laid out like the app's data folder under ``root``.
+
+    Every letter gets a scan, but the scan files are hard links to a handful
+    of templates so large corpora stay cheap on disk. The letter store,
+    keyword index, embedding store and (above ANN_MIN_ROWS) the ANN index are
+    built the same way the ingest builds them.
+    """
+    if os.path.exists(root):
+        shutil.rmtree(root)
+    for directory in (IMAGES_DIR, PHOTOS_DIR):
+        os.makedirs(os.path.join(root, directory))
+    rng = np.random.default_rng(seed)
+
+    themes = list(THEMES.values())
+    vocabulary = sorted({word for words in themes for word in words.split()} | set(COMMON_WORDS))
+    word_ids = {word: i for i, word in enumerate(vocabulary)}
+    theme_ids = [np.array([word_ids[w] for w in words.split()]) for words in themes]
+    common_ids = np.array([word_ids[w] for w in COMMON_WORDS])
+    table = np.vstack([word_vector(word, dim) for word in vocabulary])
+
+    letters = []
+    counts = np.zeros((n_letters, len(vocabulary)), dtype=np.float32)
+    for i in tqdm(range(n_letters), desc="Generating letters"):
+        length = int(rng.integers(60, 240))
+        ids = np.concatenate([
+            rng.choice(theme_ids[int(rng.integers(len(themes)))], size=length * 2 // 3),
+            rng.choice(common_ids, size=length - length * 2 // 3),
+        ])
+        rng.shuffle(ids)
+        np.add.at(counts[i], ids, 1)
+        year = int(rng.integers(1960, 2024))
+        letters.append({
+            "is_letter": True,
+            "from": SENDERS[int(rng.integers(len(SENDERS)))],
+            "to": RECIPIENTS[int(rng.integers(len(RECIPIENTS)))],
+            "date": f"{int(rng.integers(1, 29)):02d}/{int(rng.integers(1, 13)):02d}/{year}",
+            "text": " ".join(vocabulary[j] for j in ids).capitalize() + ".",
+            "image_path": f"{IMAGES_DIR}/letter_{i:06d}.jpg",
+        })
+
+    with open(os.path.join(root, LETTERS_PATH), "w", encoding="utf-8") as f:
+        json.dump(letters, f, ensure_ascii=False)
+
+    scan_templates = []
+    for t in range(4):
+        template = os.path.join(root, f"scan_template_{t}.jpg")
+        fake_scan(template, seed + t)
+        scan_templates.append(template)
+    for t, template in enumerate(scan_templates):
+        link_copies(template, [
+            os.path.join(root, letter["image_path"]) for letter in letters[t::len(scan_templates)]
+        ])
+
+    photo_templates = []
+    for t in range(8):
+        template = os.path.join(root, f"photo_template_{t}.jpg")
+        fake_photo(template, seed + t, f"{1970 + 6 * t}:0{1 + t % 9}:15 12:00:00")
+        photo_templates.append(template)
+    photo_paths = [os.path.join(root, PHOTOS_DIR, f"photo_{i:06d}.jpg") for i in range(n_photos)]
+    for t, template in enumerate(photo_templates):
+        link_copies(template, photo_paths[t::len(photo_templates)])
+
+    # Same vectors the stub backend would return, computed in one product
+    matrix = counts @ table
+    save_embedding_store(
+        os.path.join(root, EMBEDDINGS_MATRIX_PATH),
+        matrix,
+        [letter["image_path"] for letter in letters],
+        backend=StubBackend.name,
+        model=f"hashed-words-{dim}",
+        hashes=[text_hash(letter["text"]) for letter in letters]
+    )
+    build_letter_store(os.path.join(root, LETTERS_PATH), os.path.join(root, LETTERS_DB_PATH))
+    LexicalIndex.build(letters).save(os.path.join(root, LEXICAL_INDEX_PATH))
+    if n_letters >= ANN_MIN_ROWS:
+        matrix_path = os.path.join(root, EMBEDDINGS_MATRIX_PATH)
+        IVFIndex.build(np.load(matrix_path)).save(ann_path_for(matrix_path))
+
+def ensure_corpus(work_dir, n_letters, n_photos, dim, regenerate=False):
+    """Reuse a previously generated corpus with the same parameters."""
+    root = os.path.join(work_dir, f"corpus-{n_letters}")
+    params = {"format": CORPUS_FORMAT, "letters": n_letters, "photos": n_photos, "dim": dim}
+    marker = os.path.join(root, "corpus.json")
+    if not regenerate and os.path.exists(marker):
+        with open(marker, "r", encoding="utf-8") as f:
+            if json.load(f) == params:
+                return root
+    start = time.perf_counter()
+    generate_corpus(root, n_letters, n_photos, dim)
+    with open(marker, "w", encoding="utf-8") as f:
+        json.dump(params, f)
+    print(f"✅ Generated {n_letters} letters in {time.perf_counter() - start:.1f}s")
+    return root
+
+def measure(fn, repeat, setup=None):
+    """Timing summary of ``fn`` over ``repeat`` runs; ``setup`` runs untimed before each."""
+    times = []
+    for run in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn(run)
+        times.append(time.perf_counter() - start)
+    return {
+        "median_ms": statistics.median(times) * 1000,
+        "min_ms": min(times) * 1000,
+        "max_ms": max(times) * 1000,
+        "runs": repeat,
+    }
+
+def benchmark_corpus(root, repeat):
+    """Time the app's data paths against the corpus in ``root``."""
+    def reset_caches():
+        utils._load_corpus.clear()
+        utils._load_photo_catalog.clear()
+        utils.get_query_cache.clear()
+
+    # The app's paths are relative to its root
+    os.chdir(root)
+    reset_caches()
+    if os.path.exists(QUERY_CACHE_PATH):
+        os.remove(QUERY_CACHE_PATH)
+    results = {}
+
+    results["load_letters_cold"] = measure(
+        lambda run: load_letters()[0:5],
+        repeat,
+        setup=reset_caches
+    )
+    results["load_letters_warm"] = measure(lambda run: load_letters()[0:5], repeat)
+    results["load_embeddings_cold"] = measure(lambda run: load_embeddings(), repeat, setup=reset_caches)
+    results["load_embedding_matrix_cold"] = measure(
+        lambda run: load_embedding_matrix(),
+        repeat,
+        setup=reset_caches
+    )
+    results["load_lexical_index_cold"] = measure(lambda run: load_lexical_index(), repeat, setup=reset_caches)
+
+    emb_matrix = load_embedding_matrix()
+    lexical = load_lexical_index()
+    ann = load_ann_index()
+    results["embed_query_miss"] = measure(
+        lambda run: embed_query(f"{QUERIES[run % len(QUERIES)]} {run}"),
+        repeat
+    )
+    results["embed_query_hit"] = measure(lambda run: embed_query(QUERIES[0]), repeat)
+
+    vectors = [embed_query(query) for query in QUERIES]
+    hits = {}
+
+    def semantic(run):
+        q_emb = vectors[run % len(vectors)]
+        rows = ann.candidate_rows(q_emb, ANN_NPROBE) if ann else None
+        hits.setdefault("semantic", len(top_k(emb_matrix, q_emb, k=10, threshold=SEARCH_THRESHOLD, rows=rows)))
+
+    def hybrid(run):
+        top = hybrid_search(
+            emb_matrix,
+            vectors[run % len(vectors)],
+            lexical,
+            QUERIES[run % len(QUERIES)],
+            k=10,
+            threshold=SEARCH_THRESHOLD,
+            candidates=HYBRID_CANDIDATES,
+            semantic_weight=HYBRID_SEMANTIC_WEIGHT,
+            prune=HYBRID_PRUNE,
+            rrf_k=RRF_K,
+            ann=ann,
+            nprobe=ANN_NPROBE
+        )
+        hits.setdefault("hybrid", len(top))
+
+    def keyword(run):
+        hits.setdefault("keyword", len(lexical.search(QUERIES[run % len(QUERIES)], k=10)))
+
+    searches = repeat * len(QUERIES)
+    results["search_semantic"] = measure(semantic, searches)
+    results["search_hybrid"] = measure(hybrid, searches)
+    results["search_keyword"] = measure(keyword, searches)
+    for mode, count in hits.items():
+        results[f"search_{mode}"]["hits"] = count
+
+    # One gallery page; cold runs create the WebP derivatives
+    letters = load_letters()
+    page = letters[0:5]
+
+    def show_page(run):
+        for letter in page:
+            show_letter(letter)
+
+    results["show_letter_cold"] = measure(
+        show_page,
+        repeat,
+        setup=lambda: shutil.rmtree(DERIVATIVES_DIR, ignore_errors=True)
+    )
+    results["show_letter_warm"] = measure(show_page, repeat)
+
+    def drop_manifest():
+        if os.path.exists(PHOTO_MANIFEST_PATH):
+            os.remove(PHOTO_MANIFEST_PATH)
+
+    results["photos_catalog_cold"] = measure(
+        lambda run: load_catalog(PHOTOS_DIR, PHOTO_MANIFEST_PATH),
+        repeat,
+        setup=drop_manifest
+    )
+    results["photos_catalog_manifest"] = measure(lambda run: load_catalog(PHOTOS_DIR, PHOTO_MANIFEST_PATH), repeat)
+    results["load_photo_catalog_warm"] = measure(lambda run: load_photo_catalog(), repeat)
+
+    reset_caches()
+    return results
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT_DIR,
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(report, baseline, tolerance, min_delta_ms):
+    """Print the change against ``baseline``; return the metrics that got slower.
+
+    Sub-millisecond timings are noisy, so a slowdown also has to exceed
+    ``min_delta_ms`` to count.
+    """
+    regressions = []
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'}:")
+    for size, metrics in report["results"].items():
+        for name, timing in metrics.items():
+            before = baseline["results"].get(size, {}).get(name)
+            if not before or not before["median_ms"]:
+                continue
+            change = timing["median_ms"] / before["median_ms"] - 1
+            flag = ""
+            if change > tolerance and timing["median_ms"] - before["median_ms"] > min_delta_ms:
+                flag = "  ❌"
+                regressions.append(f"{size}/{name}")
+            print(f"{size:>7} {name:<28} {before['median_ms']:10.2f} -> {timing['median_ms']:10.2f} ms ({change:+.0%}){flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark loading, search, letter display and photo listing on synthetic archives."
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 100000],
+        help="Numbers of letters to generate"
+    )
+    parser.add_argument("--photos", type=float, default=0.1, help="Photos per letter")
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement")
+    parser.add_argument("--work-dir", default="data/benchmark", help="Where the synthetic corpora are kept")
+    parser.add_argument("--regenerate", action="store_true", help="Generate the corpora even if they exist")
+    parser.add_argument("--output", help="JSON results file (default: <work-dir>/results-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Slowdown (fraction) reported as a regression by --compare"
+    )
+    parser.add_argument(
+        "--min-delta-ms",
+        type=float,
+        default=1.0,
+        help="Smallest slowdown in milliseconds reported as a regression"
+    )
+    args = parser.parse_args()
+
+    # Pages run in Streamlit's bare mode, which logs a warning per element;
+    # the config is parsed first because parsing resets the log level
+    streamlit_config.get_option("logger.level")
+    streamlit_logger.set_log_level("error")
+    # Letter stores name the stub as their backend, so queries never reach the network
+    embedding_backends.BACKENDS[StubBackend.name] = StubBackend
+
+    work_dir = os.path.abspath(os.path.join(ROOT_DIR, args.work_dir))
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "dim": args.dim,
+        "results": {},
+    }
+    for size in args.sizes:
+        root = ensure_corpus(work_dir, size, int(size * args.photos), args.dim, args.regenerate)
+        print(f"Benchmarking {size} letters...")
+        results = benchmark_corpus(root, args.repeat)
+        report["results"][str(size)] = results
+        for name, timing in results.items():
+            print(f"{size:>7} {name:<28} {timing['median_ms']:10.2f} ms")
+    os.chdir(ROOT_DIR)
+
+    output = args.output or os.path.join(work_dir, f"results-{commit or 'local'}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results saved to {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"❌ {len(regressions)} regressions above {args.tolerance:.0%}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import os
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tqdm import tqdm
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import (
+    IMAGES_DIR,
+    RASTER_DIR,
+    PHOTOS_DIR,
+    DERIVATIVES_DIR,
+    DERIVATIVE_WIDTHS,
+    PHOTO_GRID_WIDTH,
+    PHOTO_FULL_WIDTH,
+    OCR_JOURNAL_PATH,
+)
+from image_derivatives import make_derivatives
+from ocr_journal import Journal
+
+LETTER_IMAGES = (".jpg", ".jpeg", ".png")
+PHOTO_IMAGES = (".jpg", ".jpeg", ".png", ".heic")
+
+def list_images(input_dir, extensions):
+    """Sorted paths of the images in ``input_dir`` with a supported extension."""
+    if not os.path.isdir(input_dir):
+        return []
+    return sorted(
+        entry.path
+        for entry in os.scandir(input_dir)
+        if entry.is_file() and entry.name.lower().endswith(extensions)
+    )
+
+def follow_ocr(output_dir, workers, idle_timeout):
+    """Build letter derivatives for scans as the OCR stage journals them.
+
+    Returns the number of scans that failed.
+    """
+    seen = set()
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for entry in Journal(OCR_JOURNAL_PATH).follow(idle_timeout=idle_timeout):
+            src = entry.get("image_path")
+            if entry.get("status") != "ok" or src in seen or not os.path.exists(src):
+                continue
+            seen.add(src)
+            futures[pool.submit(make_derivatives, src, DERIVATIVE_WIDTHS, output_dir)] = src
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Derivatives"):
+            try:
+                future.result()
+            except Exception as e:
+                tqdm.write(f"❌ Error processing {futures[future]}: {e}")
+                failed += 1
+    print(f"✅ Derivatives for {len(seen)} transcribed scans in {output_dir}")
+    return failed
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pre-decode letter scans and photos into resized WebP derivatives."
+    )
+    parser.add_argument(
+        "--only",
+        choices=["letters", "photos"],
+        help="Process just the letter scans or just the photos (default: both)"
+    )
+    parser.add_argument(
+        "--letters-dir",
+        action="append",
+        help=f"Folder with letter scans; repeat for several (default: {IMAGES_DIR} and {RASTER_DIR})"
+    )
+    parser.add_argument("--photos-dir", default=PHOTOS_DIR, help="Folder with the photos (HEIC supported)")
+    parser.add_argument("--output-dir", default=DERIVATIVES_DIR, help="Derivative cache folder")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Parallel processes")
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help="Process letter scans from the OCR journal as they are transcribed"
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=600,
+        help="With --follow, stop after this many seconds without new OCR results"
+    )
+    args = parser.parse_args()
+
+    if args.follow:
+        # A non-zero exit keeps the ingest pipeline from marking the stage done
+        if follow_ocr(args.output_dir, args.workers, args.idle_timeout):
+            sys.exit(1)
+        return
+
+    jobs = []
+    if args.only in (None, "letters"):
+        for letters_dir in args.letters_dir or [IMAGES_DIR, RASTER_DIR]:
+            jobs += [(src, DERIVATIVE_WIDTHS) for src in list_images(letters_dir, LETTER_IMAGES)]
+    if args.only in (None, "photos"):
+        photo_widths = (PHOTO_GRID_WIDTH, PHOTO_FULL_WIDTH)
+        jobs += [(src, photo_widths) for src in list_images(args.photos_dir, PHOTO_IMAGES)]
+
+    # Decoding (HEIC especially) is CPU-bound, so spread it across processes
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            pool.submit(make_derivatives, src, widths, args.output_dir): src
+            for src, widths in jobs
+        }
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Derivatives"):
+            try:
+                future.result()
+            except Exception as e:
+                tqdm.write(f"❌ Error processing {futures[future]}: {e}")
+                failed += 1
+
+    print(f"✅ Derivatives for {len(jobs) - failed} images in {args.output_dir}")
+    if failed:
+        print(f"❌ {failed} images failed")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
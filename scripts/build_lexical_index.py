@@ -0,0 +1,32 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import LETTERS_PATH, LEXICAL_INDEX_PATH
+from lexical_index import LexicalIndex
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the BM25 keyword index over the letters.")
+    parser.add_argument("--letters", default=LETTERS_PATH, help="Letters JSON file")
+    parser.add_argument("--output", default=LEXICAL_INDEX_PATH, help="Output .npz index path")
+    args = parser.parse_args()
+
+    with open(args.letters, "r", encoding="utf-8") as f:
+        letters = json.load(f)
+
+    start = time.perf_counter()
+    index = LexicalIndex.build(letters)
+    index.save(args.output)
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"✅ Indexed {index.num_docs} letters ({len(index.terms)} terms) "
+        f"into {args.output} in {elapsed:.2f}s"
+    )
+
+if __name__ == "__main__":
+    main()
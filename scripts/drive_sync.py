@@ -1,76 +1,182 @@
 import os
-import io
 import json
+import hashlib
+import tempfile
 import argparse
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 
-def get_drive_service():
-    """Authenticate to Google Drive using service account from environment variable."""
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from manifest import load_manifest, save_manifest
+
+DRIVE_FILES_URL = "https://www.googleapis.com/drive/v3/files"
+FILE_FIELDS = "id, name, mimeType, modifiedTime, md5Checksum, size"
+MANIFEST_NAME = ".drive_manifest.json"
+
+def get_drive_session(pool_size=8):
+    """Authenticated HTTP session for the Drive API, from the service account in the environment.
+
+    The session (and its connection pool) is shared by every download thread.
+    """
+    # Imported here so the sync logic can be used without the Google libraries
+    from google.oauth2 import service_account
+    from google.auth.transport.requests import AuthorizedSession
+    from requests.adapters import HTTPAdapter
+
     json_key_str = os.environ.get("GDRIVE_SERVICE_ACCOUNT_JSON")
     if not json_key_str:
         raise ValueError("GDRIVE_SERVICE_ACCOUNT_JSON not found in environment variables.")
-    
+
     service_account_info = json.loads(json_key_str)
     creds = service_account.Credentials.from_service_account_info(
         service_account_info,
-        scopes=["https://www.googleapis.com/auth/drive"]
+        scopes=["https://www.googleapis.com/auth/drive.readonly"]
     )
-    return build("drive", "v3", credentials=creds)
+    session = AuthorizedSession(creds)
+    session.mount("https://", HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+    return session
+
+def list_files_in_folder(session, folder_id):
+    """List every file in a Drive folder with its id, checksum and modification time.
 
-def list_files_in_folder(service, folder_id):
-    """List all files in a specific Google Drive folder."""
+    The whole folder is listed on every sync: files moved or uploaded into it
+    keep their original ``modifiedTime``, so filtering on it would miss them.
+    """
+    query = f"'{folder_id}' in parents and trashed=false"
     files = []
     page_token = None
     while True:
-        response = service.files().list(
-            q=f"'{folder_id}' in parents and trashed=false",
-            fields="nextPageToken, files(id, name)",
-            pageToken=page_token
-        ).execute()
-        files.extend(response.get("files", []))
-        page_token = response.get("nextPageToken", None)
+        response = session.get(
+            DRIVE_FILES_URL,
+            params={
+                "q": query,
+                "fields": f"nextPageToken, files({FILE_FIELDS})",
+                "pageSize": 1000,
+                "pageToken": page_token
+            }
+        )
+        response.raise_for_status()
+        data = response.json()
+        files.extend(data.get("files", []))
+        page_token = data.get("nextPageToken", None)
         if page_token is None:
             break
     return files
 
-def download_file(service, file_id, filename, local_root):
-    """Download a file from Google Drive."""
+def file_md5(path, chunk_size=1 << 20):
+    """MD5 hex digest of a local file, as reported by Drive's md5Checksum."""
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def download_file(session, drive_file, local_root, chunk_size=1 << 20):
+    """Download one file to a temporary name, verify its MD5 and rename it into place."""
+    local_path = os.path.join(local_root, drive_file["name"])
+    response = session.get(f"{DRIVE_FILES_URL}/{drive_file['id']}", params={"alt": "media"}, stream=True)
+    response.raise_for_status()
+
+    digest = hashlib.md5()
+    fd, tmp_path = tempfile.mkstemp(dir=local_root, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in response.iter_content(chunk_size):
+                f.write(chunk)
+                digest.update(chunk)
+        expected = drive_file.get("md5Checksum")
+        if expected and digest.hexdigest() != expected:
+            raise IOError(f"checksum mismatch for {drive_file['name']}")
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, local_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    finally:
+        response.close()
+    return local_path
+
+def needs_download(drive_file, manifest, local_root):
+    """Whether the local copy is missing, outdated or does not match Drive's checksum."""
+    local_path = os.path.join(local_root, drive_file["name"])
+    if not os.path.exists(local_path):
+        return True
+    known = manifest["files"].get(drive_file["id"])
+    if known is not None and all(
+        known.get(field) == drive_file.get(field)
+        for field in ("name", "md5Checksum", "modifiedTime")
+    ):
+        return False
+    # Unknown or changed on Drive: keep the local file only if it is identical
+    expected = drive_file.get("md5Checksum")
+    return not expected or file_md5(local_path) != expected
+
+def sync_folder(session, folder_id, local_root, workers=8):
+    """Download new and changed files; return ``(transferred, failed)``.
+
+    The folder listing is diffed against the manifest by file id, checksum
+    and modification time. A file is recorded in the manifest only once it
+    is downloaded and verified, so failed downloads are retried next time.
+    """
     os.makedirs(local_root, exist_ok=True)
-    local_path = os.path.join(local_root, filename)
+    manifest_path = os.path.join(local_root, MANIFEST_NAME)
+    # {"folder_id": ..., "files": {id: metadata}} from the previous sync
+    manifest = load_manifest(manifest_path)
+    if manifest.get("folder_id") != folder_id:
+        manifest = {"folder_id": folder_id, "files": {}}
+
+    files = list_files_in_folder(session, folder_id)
+    # Google Docs have no binary content to download
+    files = [f for f in files if not f.get("mimeType", "").startswith("application/vnd.google-apps")]
+    # Forget files that were removed from the folder; their local copies stay
+    listed = {f["id"] for f in files}
+    manifest = {
+        "folder_id": folder_id,
+        "files": {file_id: meta for file_id, meta in manifest["files"].items() if file_id in listed}
+    }
 
-    if os.path.exists(local_path):
-        tqdm.write(f"Skipping (exists): {filename}")
-        return
+    to_download = []
+    for f in files:
+        if needs_download(f, manifest, local_root):
+            to_download.append(f)
+        else:
+            manifest["files"][f["id"]] = f
+    print(f"{len(files)} files listed, {len(to_download)} to download")
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(download_file, session, f, local_root): f for f in to_download}
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Downloading files"):
+            f = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                tqdm.write(f"❌ Error downloading {f['name']}: {e}")
+                failed += 1
+                continue
+            manifest["files"][f["id"]] = f
+            save_manifest(manifest_path, manifest)
 
-    request = service.files().get_media(fileId=file_id)
-    fh = io.FileIO(local_path, "wb")
-    downloader = MediaIoBaseDownload(fh, request)
-    done = False
-    while not done:
-        status, done = downloader.next_chunk()
-        if status:
-            tqdm.write(f"Downloading {filename} — {int(status.progress() * 100)}%")
+    save_manifest(manifest_path, manifest)
+    return len(to_download) - failed, failed
 
 def main():
     parser = argparse.ArgumentParser(description="Sync Google Drive folder to local storage.")
     parser.add_argument("--folder-id", required=True, help="Google Drive folder ID")
     parser.add_argument("--local-root", default="archive/originals", help="Local folder to save files")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent downloads")
     args = parser.parse_args()
 
-    service = get_drive_service()
-    files = list_files_in_folder(service, args.folder_id)
-
-    # Debug print: show how many files and their names/IDs
-    print(f"DEBUG: Found {len(files)} files in the folder.")
-    for f in files:
-        print(f"DEBUG: {f['name']} (id: {f['id']})")
+    session = get_drive_session(pool_size=args.workers)
+    downloaded, failed = sync_folder(session, args.folder_id, args.local_root, args.workers)
+    print(f"✅ Downloaded {downloaded} files to {args.local_root}")
 
-    for f in tqdm(files, desc="Processing files"):
-        download_file(service, f["id"], f["name"], args.local_root)
-        
+    # A non-zero exit keeps the ingest pipeline from marking the stage done
+    if failed:
+        print(f"❌ {failed} files failed; run again to retry them")
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
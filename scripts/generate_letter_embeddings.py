@@ -1,45 +1,280 @@
 import os
+import sys
 import json
-from openai import OpenAI
 import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
 
-# Load OpenAI API key from environment variable
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-assert OPENAI_API_KEY, "Please set your OPENAI_API_KEY environment variable."
-client = OpenAI(api_key=OPENAI_API_KEY)
-
-LETTERS_PATH = "data/letters.json"
-EMBEDDINGS_PATH = "data/letter_embeddings.json"
-
-with open(LETTERS_PATH, "r", encoding="utf-8") as f:
-    letters = json.load(f)
-
-embeddings = []
-for idx, letter in enumerate(letters):
-    text = letter.get("text", "")
-    if text is None or not str(text).strip():
-        embeddings.append(None)
-        continue
-    try:
-        response = client.embeddings.create(
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import (
+    LETTERS_PATH,
+    EMBEDDINGS_PATH,
+    EMBEDDINGS_MATRIX_PATH,
+    EMBEDDING_BACKEND,
+    EMBEDDING_MODEL,
+    ANN_MIN_ROWS,
+    OCR_JOURNAL_PATH,
+    QUERY_CACHE_PATH,
+    QUERY_CACHE_SIZE,
+    SUGGESTED_QUERIES,
+)
+from ann_index import IVFIndex, ann_path_for
+from embedding_backends import get_backend
+from embedding_store import (
+    load_embedding_store,
+    save_embedding_store,
+    store_from_records,
+    text_hash,
+)
+from ocr_journal import Journal, is_valid_letter
+from query_cache import QueryEmbeddingCache
+from retry import with_backoff
+
+def warm_query_cache(backend, queries):
+    """Pre-embed suggested queries so the search page answers them offline."""
+    cache = QueryEmbeddingCache(QUERY_CACHE_PATH, max_size=QUERY_CACHE_SIZE)
+    for query in queries:
+        cache.get_or_compute(
+            query,
+            f"{backend.name}:{backend.model}",
+            lambda: backend.embed_query(query)
+        )
+    print(f"Query cache: {cache.stats()}")
+
+def embed_with_backoff(backend, texts, max_retries):
+    """Embed one batch, retrying with exponential backoff on failure."""
+    return with_backoff(lambda: backend.embed_documents(texts), max_retries, label="Batch")
+
+def load_previous(path, backend):
+    """Return {id: (hash, vector)} from an existing store built by ``backend``."""
+    if not os.path.exists(path):
+        return {}
+    store = load_embedding_store(path)
+    meta = store.meta
+    if (meta.get("backend"), meta.get("model")) != (backend.name, backend.model):
+        print(f"Existing store was built with {meta.get('backend')}: {meta.get('model')}; rebuilding")
+        return {}
+    hashes = meta.get("hashes") or [None] * len(store.ids)
+    return {
+        letter_id: (h, store.matrix[row])
+        for row, (letter_id, h) in enumerate(zip(store.ids, hashes))
+    }
+
+def embed_letters(backend, letters, batch_size, workers, max_retries, previous=None):
+    """Embed new or changed letters and return (ids, vectors, hashes, failed).
+
+    Letters whose text hash matches ``previous`` reuse the stored vector;
+    the rest are embedded in batches on a bounded thread pool. Letters of
+    failed batches are left out and counted in ``failed``.
+    """
+    previous = previous or {}
+    entries = []
+    pending = []
+    for letter in letters:
+        text = letter.get("text")
+        if text is None or not str(text).strip():
+            continue
+        letter_id = letter.get("image_path")
+        h = text_hash(str(text))
+        cached = previous.get(letter_id)
+        if cached is not None and cached[0] == h:
+            entries.append([letter_id, h, cached[1]])
+        else:
+            entry = [letter_id, h, None]
+            entries.append(entry)
+            pending.append((entry, str(text)))
+
+    print(f"{len(entries) - len(pending)} letters unchanged, {len(pending)} to embed")
+
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    # Local models already use every core; concurrency only helps remote calls
+    max_workers = workers if backend.name == "openai" else 1
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(embed_with_backoff, backend, [text for _, text in batch], max_retries): batch
+            for batch in batches
+        }
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                for (entry, _), vector in zip(batch, future.result()):
+                    entry[2] = vector
+            except Exception as e:
+                print(f"❌ Error for batch of {len(batch)} letters: {e}")
+                failed += len(batch)
+
+    embedded = [entry for entry in entries if entry[2] is not None]
+    ids = [letter_id for letter_id, _, _ in embedded]
+    hashes = [h for _, h, _ in embedded]
+    vectors = [vector for _, _, vector in embedded]
+    return ids, vectors, hashes, failed
+
+def save_store(path, backend, entries):
+    """Save ``{id: (hash, vector)}`` as the embedding store."""
+    ids = list(entries)
+    if ids:
+        matrix = np.vstack([entries[letter_id][1] for letter_id in ids]).astype(np.float32, copy=False)
+    else:
+        matrix = np.empty((0, backend.dim or 0), dtype=np.float32)
+    save_embedding_store(
+        path,
+        matrix,
+        ids,
+        backend=backend.name,
+        model=backend.model,
+        hashes=[entries[letter_id][0] for letter_id in ids]
+    )
+    return matrix
+
+def follow_ocr(backend, path, batch_size, workers, max_retries, previous, idle_timeout):
+    """Embed letters as the OCR stage journals them.
+
+    The store is saved after every batch, so the search page sees new
+    letters while OCR is still running. Letters whose text did not change
+    reuse their stored vectors. Returns the matrix and the number of
+    letters that failed to embed.
+    """
+    entries = dict(previous)
+    batch = {}
+    failed = 0
+
+    def flush():
+        nonlocal failed
+        ids, vectors, hashes, batch_failed = embed_letters(
+            backend,
+            list(batch.values()),
+            batch_size,
+            workers,
+            max_retries,
+            entries
+        )
+        failed += batch_failed
+        entries.update((letter_id, (h, vector)) for letter_id, h, vector in zip(ids, hashes, vectors))
+        batch.clear()
+        save_store(path, backend, entries)
+        print(f"Store now holds {len(entries)} embeddings")
+
+    for entry in Journal(OCR_JOURNAL_PATH).follow(idle_timeout=idle_timeout):
+        if entry.get("status") == "ok" and is_valid_letter(entry["record"]):
+            batch[entry["image_path"]] = entry["record"]
+            if len(batch) >= batch_size:
+                flush()
+    if batch:
+        flush()
+    return save_store(path, backend, entries), failed
+
+def update_ann_index(matrix_path, matrix, force=False):
+    """Build the IVF index for large stores; drop a stale one for small stores."""
+    path = ann_path_for(matrix_path)
+    if matrix.shape[0] >= ANN_MIN_ROWS or (force and matrix.shape[0] > 0):
+        start = time.perf_counter()
+        ann = IVFIndex.build(matrix)
+        ann.save(path)
+        print(f"Built ANN index with {ann.n_lists} lists in {time.perf_counter() - start:.1f}s")
+    elif os.path.exists(path):
+        os.remove(path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the binary letter embedding store.")
+    parser.add_argument("--letters", default=LETTERS_PATH, help="Letters JSON file")
+    parser.add_argument("--output", default=EMBEDDINGS_MATRIX_PATH, help="Output .npy matrix path")
+    parser.add_argument(
+        "--backend",
+        default=EMBEDDING_BACKEND,
+        help="Embedding backend: 'openai' (remote) or 'local' (sentence-transformers)"
+    )
+    parser.add_argument("--model", default=EMBEDDING_MODEL, help="Model name (defaults per backend)")
+    parser.add_argument("--batch-size", type=int, default=64, help="Letters per embedding request")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent embedding requests")
+    parser.add_argument("--max-retries", type=int, default=5, help="Retries per batch before giving up")
+    parser.add_argument("--full", action="store_true", help="Re-embed every letter instead of only changed ones")
+    parser.add_argument(
+        "--ann",
+        action="store_true",
+        help=f"Build the ANN index even below {ANN_MIN_ROWS} embeddings"
+    )
+    parser.add_argument(
+        "--convert-json",
+        metavar="PATH",
+        nargs="?",
+        const=EMBEDDINGS_PATH,
+        help="Convert a legacy letter_embeddings.json instead of calling the API"
+    )
+    parser.add_argument(
+        "--warm-queries",
+        action="store_true",
+        help="Also pre-embed the search page's suggested queries into the query cache"
+    )
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help="Embed letters from the OCR journal as they are transcribed instead of reading --letters"
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=600,
+        help="With --follow, stop after this many seconds without new OCR results"
+    )
+    args = parser.parse_args()
+
+    if args.convert_json:
+        with open(args.convert_json, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        store = store_from_records(records)
+        texts = {r.get("image_path"): r.get("text") or "" for r in records}
+        save_embedding_store(
+            args.output,
+            store.matrix,
+            store.ids,
+            backend="openai",
             model="text-embedding-3-small",
-            input=text
+            hashes=[text_hash(texts[letter_id]) for letter_id in store.ids]
         )
-        emb = response.data[0].embedding
-        embeddings.append(emb)
-    except Exception as e:
-        print(f"Error for letter {idx}: {e}")
-        embeddings.append(None)
-    time.sleep(0.5)  # avoid rate limits
-
-# Save embeddings alongside letter metadata
-output = []
-for letter, emb in zip(letters, embeddings):
-    item = dict(letter)
-    item["embedding"] = emb
-    output.append(item)
-
-with open(EMBEDDINGS_PATH, "w", encoding="utf-8") as f:
-    json.dump(output, f, ensure_ascii=False, indent=2)
-
-print(f"Saved {len(output)} embeddings to {EMBEDDINGS_PATH}")
+        print(f"Saved {len(store.ids)} embeddings to {args.output}")
+        update_ann_index(args.output, load_embedding_store(args.output).matrix, force=args.ann)
+        return
+
+    backend = get_backend(args.backend, args.model)
+    previous = {} if args.full else load_previous(args.output, backend)
+
+    if args.follow:
+        matrix, failed = follow_ocr(
+            backend,
+            args.output,
+            args.batch_size,
+            args.workers,
+            args.max_retries,
+            previous,
+            args.idle_timeout
+        )
+    else:
+        with open(args.letters, "r", encoding="utf-8") as f:
+            letters = json.load(f)
+        ids, vectors, hashes, failed = embed_letters(
+            backend,
+            letters,
+            args.batch_size,
+            args.workers,
+            args.max_retries,
+            previous
+        )
+        matrix = save_store(args.output, backend, dict(zip(ids, zip(hashes, vectors))))
+
+    print(f"Saved {matrix.shape[0]} embeddings to {args.output} ({backend.name}: {backend.model})")
+    update_ann_index(args.output, load_embedding_store(args.output).matrix, force=args.ann)
+
+    if args.warm_queries:
+        warm_query_cache(backend, SUGGESTED_QUERIES)
+
+    # Failed letters are not in the store, so the next run embeds them; a
+    # non-zero exit keeps the ingest pipeline from marking the stage done
+    if failed:
+        print(f"❌ {failed} letters failed to embed; run again to retry them")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from collections import defaultdict
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What a cold container imports before the first page is on screen
+DEFAULT_MODULES = ["main", "page_modules.home"]
+
+def measure_imports(modules):
+    """Import ``modules`` in a fresh interpreter under ``-X importtime``.
+
+    Returns ``{module: (self_us, cumulative_us)}`` for every module imported.
+    """
+    code = "; ".join(f"import {module}" for module in modules)
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+
+    timings = {}
+    for line in completed.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+def aggregate(timings):
+    """Self time in ms per top-level package, slowest first."""
+    totals = defaultdict(float)
+    for name, (self_us, _) in timings.items():
+        totals[name.split(".")[0]] += self_us / 1000
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report import time per top-level package and check it against a budget."
+    )
+    parser.add_argument(
+        "--module",
+        action="append",
+        help=f"Module to import; repeat for several (default: {' '.join(DEFAULT_MODULES)})"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Runs to take the median over")
+    parser.add_argument("--top", type=int, default=15, help="Packages to list")
+    parser.add_argument("--budget-ms", type=float, help="Exit with status 1 if the total exceeds this")
+    parser.add_argument("--json", help="Write the report to this JSON file")
+    args = parser.parse_args()
+
+    modules = args.module or DEFAULT_MODULES
+    runs = [dict(aggregate(measure_imports(modules))) for _ in range(args.repeat)]
+    packages = {name for run in runs for name in run}
+    report = sorted(
+        ((name, statistics.median(run.get(name, 0.0) for run in runs)) for name in packages),
+        key=lambda item: item[1],
+        reverse=True
+    )
+    total = statistics.median(sum(run.values()) for run in runs)
+
+    print(f"Import time for {', '.join(modules)} (median of {args.repeat} runs)")
+    for name, ms in report[:args.top]:
+        print(f"{name:<30} {ms:9.1f} ms")
+    if len(report) > args.top:
+        rest = sum(ms for _, ms in report[args.top:])
+        print(f"{f'({len(report) - args.top} more)':<30} {rest:9.1f} ms")
+    print(f"{'Total':<30} {total:9.1f} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(
+                {"modules": modules, "repeat": args.repeat, "total_ms": total, "packages": dict(report)},
+                f,
+                indent=2
+            )
+
+    if args.budget_ms is not None:
+        if total > args.budget_ms:
+            print(f"❌ Over budget: {total:.1f} ms > {args.budget_ms:.1f} ms")
+            sys.exit(1)
+        print(f"✅ Within budget: {total:.1f} ms <= {args.budget_ms:.1f} ms")
+
+if __name__ == "__main__":
+    main()
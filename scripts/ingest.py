@@ -0,0 +1,143 @@
+import os
+import sys
+import argparse
+import subprocess
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import (
+    ARCHIVE_PDF_DIR,
+    DERIVATIVES_DIR,
+    EMBEDDING_BACKEND,
+    EMBEDDINGS_MATRIX_PATH,
+    IMAGES_DIR,
+    INGEST_LOG_DIR,
+    INGEST_STATE_PATH,
+    LETTERS_DB_PATH,
+    LETTERS_PATH,
+    LEXICAL_INDEX_PATH,
+    PHOTOS_DIR,
+    RASTER_DIR,
+    STRANGE_PATH,
+)
+from letter_store import build_letter_store
+from pipeline import Stage, run_pipeline
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPTS_DIR)
+
+def script(name, *args):
+    """Stage action running one of the scripts, with its output in INGEST_LOG_DIR."""
+    def run():
+        os.makedirs(INGEST_LOG_DIR, exist_ok=True)
+        log_path = os.path.join(INGEST_LOG_DIR, f"{os.path.splitext(name)[0]}.log")
+        with open(log_path, "w", encoding="utf-8") as log:
+            completed = subprocess.run(
+                [sys.executable, os.path.join(SCRIPTS_DIR, name), *args],
+                stdout=log,
+                stderr=subprocess.STDOUT
+            )
+        if completed.returncode != 0:
+            raise RuntimeError(f"{name} exited with status {completed.returncode}, see {log_path}")
+    return run
+
+def source(*names):
+    """Code files a stage depends on, so editing them re-runs the stage."""
+    return tuple(os.path.join(ROOT_DIR, name) for name in names)
+
+def build_stages(drive_folder=None, backend=EMBEDDING_BACKEND):
+    """The ingest graph: sync -> rasterize -> OCR -> store/index/embeddings, plus derivatives."""
+    stages = []
+    if drive_folder:
+        stages.append(Stage(
+            "sync",
+            script("drive_sync.py", "--folder-id", drive_folder, "--local-root", ARCHIVE_PDF_DIR),
+            outputs=(ARCHIVE_PDF_DIR,),
+            always=True
+        ))
+    stages += [
+        Stage(
+            "rasterize",
+            script("rasterize_pdfs.py", "--input-dir", ARCHIVE_PDF_DIR, "--output-dir", RASTER_DIR),
+            inputs=(ARCHIVE_PDF_DIR,) + source("pdf_raster.py", "scripts/rasterize_pdfs.py"),
+            outputs=(RASTER_DIR,),
+            deps=("sync",) if drive_folder else ()
+        ),
+        Stage(
+            "ocr",
+            script("ocr_openai.py", "--input-dir", IMAGES_DIR, "--input-dir", RASTER_DIR),
+            inputs=(IMAGES_DIR, RASTER_DIR) + source("scan_preprocess.py", "scripts/ocr_openai.py"),
+            outputs=(LETTERS_PATH, STRANGE_PATH),
+            deps=("rasterize",)
+        ),
+        Stage(
+            "store",
+            lambda: build_letter_store(LETTERS_PATH, LETTERS_DB_PATH),
+            inputs=(LETTERS_PATH,) + source("letter_store.py"),
+            outputs=(LETTERS_DB_PATH,),
+            deps=("ocr",)
+        ),
+        Stage(
+            "lexical",
+            script("build_lexical_index.py"),
+            inputs=(LETTERS_PATH,) + source("lexical_index.py"),
+            outputs=(LEXICAL_INDEX_PATH,),
+            deps=("ocr",)
+        ),
+        Stage(
+            "embeddings",
+            script("generate_letter_embeddings.py", "--backend", backend),
+            inputs=(LETTERS_PATH,) + source("embedding_backends.py", "scripts/generate_letter_embeddings.py"),
+            outputs=(EMBEDDINGS_MATRIX_PATH,),
+            deps=("ocr",)
+        ),
+        # Needs the scans (including PDF pages) and photos, not OCR, so it runs alongside OCR
+        Stage(
+            "derivatives",
+            script("build_derivatives.py"),
+            inputs=(IMAGES_DIR, RASTER_DIR, PHOTOS_DIR) + source("image_derivatives.py"),
+            outputs=(DERIVATIVES_DIR,),
+            deps=("rasterize",)
+        ),
+    ]
+    return stages
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the whole ingest (sync, rasterize, OCR, indexes, embeddings, derivatives)."
+    )
+    parser.add_argument("--drive-folder", help="Google Drive folder ID to sync first (skipped when omitted)")
+    parser.add_argument("--backend", default=EMBEDDING_BACKEND, help="Embedding backend: 'openai' or 'local'")
+    parser.add_argument("--workers", type=int, default=4, help="Stages allowed to run at the same time")
+    parser.add_argument(
+        "--force",
+        action="append",
+        default=[],
+        metavar="STAGE",
+        help="Run a stage even if its inputs are unchanged; repeat for several"
+    )
+    args = parser.parse_args()
+
+    os.chdir(ROOT_DIR)
+    start = time.perf_counter()
+    results = run_pipeline(
+        build_stages(args.drive_folder, args.backend),
+        INGEST_STATE_PATH,
+        workers=args.workers,
+        force=set(args.force)
+    )
+
+    icons = {"ran": "✅", "skipped": "⏭️", "failed": "❌", "blocked": "⛔"}
+    for result in results:
+        line = f"{icons[result.status]} {result.name:<12} {result.status:<8} {result.seconds:8.2f}s"
+        if result.error:
+            line += f"  {result.error}"
+        print(line)
+    print(f"Total: {time.perf_counter() - start:.2f}s")
+
+    if any(result.status in ("failed", "blocked") for result in results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
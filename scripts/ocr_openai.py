@@ -1,23 +1,90 @@
 import os
 import re
+import sys
+import time
 import base64
 import json
+import difflib
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from io import BytesIO
 from PIL import Image
 from tqdm import tqdm
 from openai import OpenAI
-from pdf2image import convert_from_path
 import random
 
-client = OpenAI()
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-def encode_image(image_path):
-    """Convert image file to base64 string."""
+from config import (
+    IMAGES_DIR,
+    LETTERS_PATH,
+    LETTERS_DB_PATH,
+    STRANGE_PATH,
+    OCR_CACHE_DIR,
+    OCR_JOURNAL_PATH,
+    OCR_LONG_EDGE,
+    OCR_MAX_BYTES,
+)
+from letter_store import build_letter_store
+from ocr_journal import Journal, ResultCache, compact, file_hash, result_key
+from retry import with_backoff
+from scan_preprocess import PreparedScan, prepare_scan
+
+MODEL = "gpt-4o"
+# Bump whenever PROMPT or the request changes so cached results are redone
+PROMPT_VERSION = 1
+PROMPT = (
+    "A imagem fornecida pode ser uma carta escrita em português, uma foto, ou outro tipo de documento. "
+    "Analise cuidadosamente e responda estritamente em JSON, seguindo estas instruções:\n"
+    "1. Se NÃO for uma carta (por exemplo, for uma foto, página em branco, ou outro tipo de documento), defina o campo 'is_letter' como false.\n"
+    "2. Se for uma carta, defina 'is_letter' como true e extraia:\n"
+    "   - Quem escreveu a carta ('from')\n"
+    "   - Para quem foi escrita ('to')\n"
+    "   - Data da carta, se visível ('date')\n"
+    "   - Texto completo da carta ('text')\n"
+    "3. O campo 'date' deve estar sempre no formato DD/MM/AAAA (exemplo: 05/08/2025) ou null se não houver data.\n"
+    "4. Mantenha ortografia e pontuação originais do texto.\n"
+    "5. Sempre inclua o campo 'image_path' com o caminho relativo da imagem.\n\n"
+    "Formato de resposta:\n"
+    "{\n"
+    "  \"is_letter\": true ou false,\n"
+    "  \"from\": \"Nome de quem escreveu ou null\",\n"
+    "  \"to\": \"Nome do destinatário ou null\",\n"
+    "  \"date\": \"DD/MM/AAAA ou null\",\n"
+    "  \"text\": \"Transcrição completa ou null\",\n"
+    "  \"image_path\": \"CAMINHO_RELATIVO_DA_IMAGEM\"\n"
+    "}"
+)
+# prepare_scan options used unless overridden on the command line
+DEFAULT_PREPROCESS = {"long_edge": OCR_LONG_EDGE, "max_bytes": OCR_MAX_BYTES, "grayscale": True, "crop": True}
+
+_client = None
+
+def get_client():
+    """Shared OpenAI client, created on first use (it is thread-safe)."""
+    global _client
+    if _client is None:
+        _client = OpenAI()
+    return _client
+
+def encode_image(image_path, preprocess=None):
+    """Return the scan as a ``PreparedScan`` ready for upload.
+
+    ``preprocess`` holds ``prepare_scan`` options; without it the
+    full-resolution scan is re-encoded as is.
+    """
+    if preprocess is not None:
+        return prepare_scan(image_path, **preprocess)
     with Image.open(image_path) as img:
         img = img.convert("RGB")
         buffered = BytesIO()
         img.save(buffered, format="JPEG")
-        return base64.b64encode(buffered.getvalue()).decode("utf-8")
+        return PreparedScan(buffered.getvalue(), os.path.getsize(image_path), img.width, img.height, None)
+
+def result_variant(preprocess):
+    """Prompt and preprocessing settings that a cached result depends on."""
+    settings = json.dumps(preprocess, sort_keys=True) if preprocess else "raw"
+    return f"v{PROMPT_VERSION}:{settings}"
 
 def clean_json_output(raw_output):
     """Remove triple backticks and language hints like ```json."""
@@ -27,41 +94,18 @@ def clean_json_output(raw_output):
     cleaned = re.sub(r"\s*```$", "", cleaned)
     return cleaned.strip()
 
-def ocr_with_openai(image_path, relative_path):
-    """Extract structured OCR data from an image using OpenAI."""
-    base64_image = encode_image(image_path)
-
-    prompt = (
-        "A imagem fornecida pode ser uma carta escrita em português, uma foto, ou outro tipo de documento. "
-        "Analise cuidadosamente e responda estritamente em JSON, seguindo estas instruções:\n"
-        "1. Se NÃO for uma carta (por exemplo, for uma foto, página em branco, ou outro tipo de documento), defina o campo 'is_letter' como false.\n"
-        "2. Se for uma carta, defina 'is_letter' como true e extraia:\n"
-        "   - Quem escreveu a carta ('from')\n"
-        "   - Para quem foi escrita ('to')\n"
-        "   - Data da carta, se visível ('date')\n"
-        "   - Texto completo da carta ('text')\n"
-        "3. O campo 'date' deve estar sempre no formato DD/MM/AAAA (exemplo: 05/08/2025) ou null se não houver data.\n"
-        "4. Mantenha ortografia e pontuação originais do texto.\n"
-        "5. Sempre inclua o campo 'image_path' com o caminho relativo da imagem.\n\n"
-        "Formato de resposta:\n"
-        "{\n"
-        "  \"is_letter\": true ou false,\n"
-        "  \"from\": \"Nome de quem escreveu ou null\",\n"
-        "  \"to\": \"Nome do destinatário ou null\",\n"
-        "  \"date\": \"DD/MM/AAAA ou null\",\n"
-        "  \"text\": \"Transcrição completa ou null\",\n"
-        "  \"image_path\": \"CAMINHO_RELATIVO_DA_IMAGEM\"\n"
-        "}"
-    )
+def ocr_with_openai(scan, relative_path):
+    """Extract structured OCR data from a ``PreparedScan`` using OpenAI."""
+    base64_image = base64.b64encode(scan.data).decode("utf-8")
 
-    response = client.chat.completions.create(
-        model="gpt-4o",
+    response = get_client().chat.completions.create(
+        model=MODEL,
         messages=[
             {"role": "system", "content": "Você é um arquivista especializado em cartas antigas escritas em português."},
             {
                 "role": "user",
                 "content": [
-                    {"type": "text", "text": prompt.replace("CAMINHO_RELATIVO_DA_IMAGEM", relative_path)},
+                    {"type": "text", "text": PROMPT.replace("CAMINHO_RELATIVO_DA_IMAGEM", relative_path)},
                     {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}}
                 ]
             }
@@ -69,74 +113,242 @@ def ocr_with_openai(image_path, relative_path):
         temperature=0
     )
 
-    raw_output = response.choices[0].message.content
-    print("\n--- RAW MODEL OUTPUT ---\n")
-    print(raw_output)
-    print("\n------------------------\n")
-
-    cleaned_output = clean_json_output(raw_output)
+    cleaned_output = clean_json_output(response.choices[0].message.content)
 
     try:
         return json.loads(cleaned_output)
     except json.JSONDecodeError as e:
-        print(f"❌ JSON parsing error: {e}")
-        print("Cleaned output:\n", cleaned_output)
-        raise ValueError("OpenAI did not return valid JSON")
+        raise ValueError(f"OpenAI did not return valid JSON: {e}")
+
+def ocr_with_backoff(scan, relative_path, max_retries):
+    """OCR one scan, retrying with exponential backoff on failure."""
+    return with_backoff(
+        lambda: ocr_with_openai(scan, relative_path),
+        max_retries,
+        label=f"OCR for {relative_path}",
+        log=tqdm.write
+    )
 
-def process_all_files(input_dir="archive/originals", output_json="archive/letters.json"):
+def ocr_scan(rel_path, preprocess, max_retries):
+    """Prepare and OCR one scan; return ``(record, PreparedScan)``."""
+    scan = encode_image(rel_path, preprocess)
+    return ocr_with_backoff(scan, rel_path, max_retries), scan
 
-    # Update: Only process .jpg files from local data/all_letters directory
-    input_dir = "data/all_letters"  # Local directory with all jpg files
-    output_json = "data/letters.json"  # Output for classified letters
-    output_strange = "data/strange.json"  # Output for strange/unclassified
-    os.makedirs(os.path.dirname(output_json), exist_ok=True)
-    supported_images = (".jpg",)
+def run_ocr(files, journal, cache, workers=4, max_retries=3, preprocess=None):
+    """OCR ``files`` (relative paths), streaming every result to ``journal``.
 
-    all_letters = []
-    strange_letters = []
+    Scans already finished in the journal are skipped, cached results are
+    reused without calling the API, and the rest run on a bounded thread
+    pool. Every completed scan is journaled immediately, so an interrupted
+    run resumes where it stopped and later stages can follow the journal
+    while OCR is still running. Upload sizes are reported per scan.
+    Returns the number of scans that failed.
+    """
+    journal.append({"event": "start"})
+    try:
+        return _run_ocr(files, journal, cache, workers, max_retries, preprocess)
+    finally:
+        journal.append({"event": "end"})
 
-    files = [f for f in os.listdir(input_dir) if f.lower().endswith(supported_images)]
+def _run_ocr(files, journal, cache, workers, max_retries, preprocess):
+    finished = journal.latest()
+    pending = []
+    journaled = reused = 0
+    for rel_path in tqdm(files, desc="Hashing scans"):
+        key = result_key(file_hash(rel_path), MODEL, result_variant(preprocess))
+        entry = finished.get(key)
+        if entry is not None and entry["status"] == "ok" and entry["image_path"] == rel_path:
+            journaled += 1
+            continue
+        cached = entry["record"] if entry is not None and entry["status"] == "ok" else cache.get(key)
+        if cached is not None:
+            record = dict(cached, image_path=rel_path)
+            journal.append({"key": key, "image_path": rel_path, "status": "ok", "record": record})
+            reused += 1
+            continue
+        pending.append((key, rel_path))
 
-    for filename in tqdm(files, desc="OpenAI OCR (Portuguese letters)"):
-        file_path = os.path.join(input_dir, filename)
-        try:
-            rel_path = os.path.relpath(file_path, start=".")
-            data = ocr_with_openai(file_path, rel_path)
-            # Use AI's is_letter flag and date format for classification
-            is_letter = data.get("is_letter", None)
-            date_val = data.get("date")
-            # Accept only DD/MM/YYYY or null for date
-            valid_date = False
-            if date_val:
-                import re
-                valid_date = bool(re.match(r"^\d{2}/\d{2}/\d{4}$", date_val))
-            if is_letter is False or not is_letter:
-                strange_letters.append(data)
-            elif not data.get("text") or not data["text"].strip() or len(data["text"].strip()) < 20 or not valid_date:
-                strange_letters.append(data)
-            else:
-                all_letters.append(data)
-        except Exception as e:
-            tqdm.write(f"❌ Error processing {filename}: {e}")
-            strange_letters.append({
-                "is_letter": None,
-                "from": None,
-                "to": None,
-                "date": None,
-                "text": None,
+    print(f"{journaled} scans already journaled, {reused} from cache, {len(pending)} to OCR")
+
+    original_total = sent_total = 0
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(ocr_scan, rel_path, preprocess, max_retries): (key, rel_path)
+            for key, rel_path in pending
+        }
+        for future in tqdm(as_completed(futures), total=len(futures), desc="OpenAI OCR (Portuguese letters)"):
+            key, rel_path = futures[future]
+            try:
+                data, scan = future.result()
+                record = dict(data, image_path=rel_path)
+            except Exception as e:
+                tqdm.write(f"❌ Error processing {rel_path}: {e}")
+                journal.append({"key": key, "image_path": rel_path, "status": "error", "error": str(e)})
+                failed += 1
+                continue
+            cache.put(key, record)
+            journal.append({
+                "key": key,
                 "image_path": rel_path,
-                "error": str(e)
+                "status": "ok",
+                "record": record,
+                "bytes_original": scan.original_bytes,
+                "bytes_sent": len(scan.data)
             })
+            original_total += scan.original_bytes
+            sent_total += len(scan.data)
+            tqdm.write(
+                f"{rel_path}: {scan.original_bytes / 1024:.0f} KB -> {len(scan.data) / 1024:.0f} KB "
+                f"({scan.width}x{scan.height}, saved {scan.bytes_saved / 1024:.0f} KB)"
+            )
+
+    if sent_total:
+        print(
+            f"Uploaded {sent_total / 1e6:.1f} MB instead of {original_total / 1e6:.1f} MB "
+            f"({1 - sent_total / original_total:.0%} saved)"
+        )
+    return failed
+
+def validate(letters_path, sample_size, cache, workers=4, max_retries=3, preprocess=None):
+    """Re-OCR a sample of known letters and compare with their transcriptions.
+
+    Prints per-letter text similarity (difflib ratio) and upload size, then
+    the averages. Results go to the cache only, so a later full run reuses them.
+    """
+    with open(letters_path, "r", encoding="utf-8") as f:
+        known = [letter for letter in json.load(f) if os.path.exists(letter.get("image_path") or "")]
+    sample = random.Random(0).sample(known, min(sample_size, len(known)))
 
-    # Save as JSON
-    with open(output_json, "w", encoding="utf-8") as f:
-        json.dump(all_letters, f, ensure_ascii=False, indent=2)
+    def check(letter):
+        rel_path = letter["image_path"]
+        key = result_key(file_hash(rel_path), MODEL, result_variant(preprocess))
+        scan = encode_image(rel_path, preprocess)
+        data = cache.get(key)
+        if data is None:
+            data = ocr_with_backoff(scan, rel_path, max_retries)
+            cache.put(key, dict(data, image_path=rel_path))
+        ratio = difflib.SequenceMatcher(None, letter.get("text") or "", data.get("text") or "").ratio()
+        return rel_path, ratio, data.get("date") == letter.get("date"), scan
+
+    start = time.perf_counter()
+    ratios = []
+    dates = 0
+    original_total = sent_total = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for future in as_completed([pool.submit(check, letter) for letter in sample]):
+            try:
+                rel_path, ratio, same_date, scan = future.result()
+            except Exception as e:
+                print(f"❌ {e}")
+                continue
+            ratios.append(ratio)
+            dates += same_date
+            original_total += scan.original_bytes
+            sent_total += len(scan.data)
+            print(f"{rel_path}: similarity {ratio:.3f}, {scan.original_bytes / 1024:.0f} KB -> {len(scan.data) / 1024:.0f} KB")
+
+    if ratios:
+        print(f"Mean text similarity: {sum(ratios) / len(ratios):.3f} over {len(ratios)} letters")
+        print(f"Same date: {dates}/{len(ratios)}")
+        print(f"Uploaded {sent_total / 1e6:.1f} MB instead of {original_total / 1e6:.1f} MB")
+        print(f"Wall time: {time.perf_counter() - start:.1f}s")
+
+def process_all_files(
+    input_dirs=(IMAGES_DIR,),
+    output_json=LETTERS_PATH,
+    output_strange=STRANGE_PATH,
+    workers=4,
+    max_retries=3,
+    preprocess=DEFAULT_PREPROCESS
+):
+    """OCR every .jpg in ``input_dirs`` and split the results into letters and strange items.
+
+    Returns the number of scans that failed; they are retried on the next run.
+    """
+    os.makedirs(os.path.dirname(output_json), exist_ok=True)
+    supported_images = (".jpg",)
+
+    files = sorted(
+        os.path.relpath(os.path.join(input_dir, f), start=".")
+        for input_dir in input_dirs
+        for f in os.listdir(input_dir)
+        if f.lower().endswith(supported_images)
+    )
+
+    with Journal(OCR_JOURNAL_PATH) as journal:
+        failed = run_ocr(files, journal, ResultCache(OCR_CACHE_DIR), workers, max_retries, preprocess)
+        # Use AI's is_letter flag and date format for classification
+        letters, strange = compact(journal, output_json, output_strange, paths=files)
+
+    print(f"✅ Saved {letters} letters to {output_json}")
+    print(f"✅ Saved {strange} strange/unclassified items to {output_strange}")
+    if failed:
+        print(f"❌ {failed} scans failed; run again to retry them")
+    return failed
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe letter scans with OpenAI.")
+    parser.add_argument(
+        "--input-dir",
+        action="append",
+        help=f"Folder with .jpg scans; repeat for several (default: {IMAGES_DIR})"
+    )
+    parser.add_argument("--output", default=LETTERS_PATH, help="Letters JSON file")
+    parser.add_argument("--strange", default=STRANGE_PATH, help="JSON file for scans that are not valid letters")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent OCR requests")
+    parser.add_argument("--max-retries", type=int, default=3, help="Retries per scan before giving up")
+    parser.add_argument("--long-edge", type=int, default=OCR_LONG_EDGE, help="Longest side of uploaded scans, in pixels")
+    parser.add_argument("--max-bytes", type=int, default=OCR_MAX_BYTES, help="Byte budget per uploaded scan")
+    parser.add_argument("--color", action="store_true", help="Keep scans in color instead of grayscale")
+    parser.add_argument("--no-crop", action="store_true", help="Do not crop blank margins")
+    parser.add_argument("--no-preprocess", action="store_true", help="Upload full-resolution scans")
+    parser.add_argument(
+        "--validate",
+        type=int,
+        metavar="N",
+        help="Re-OCR N letters from --output and compare with the existing transcriptions"
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Only rebuild --output and --strange from the OCR journal, without calling the API"
+    )
+    parser.add_argument(
+        "--store",
+        action="store_true",
+        help=f"Also rebuild the SQLite letter store ({LETTERS_DB_PATH}) from --output"
+    )
+    args = parser.parse_args()
+
+    preprocess = None if args.no_preprocess else {
+        "long_edge": args.long_edge,
+        "max_bytes": args.max_bytes,
+        "grayscale": not args.color,
+        "crop": not args.no_crop
+    }
+    if args.validate:
+        validate(args.output, args.validate, ResultCache(OCR_CACHE_DIR), args.workers, args.max_retries, preprocess)
+        return
+
+    failed = 0
+    if args.compact:
+        try:
+            letters, strange = compact(Journal(OCR_JOURNAL_PATH), args.output, args.strange)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"✅ Compacted the journal into {letters} letters and {strange} strange/unclassified items")
+    else:
+        failed = process_all_files(args.input_dir or [IMAGES_DIR], args.output, args.strange, args.workers, args.max_retries, preprocess)
 
-    with open(output_strange, "w", encoding="utf-8") as f:
-        json.dump(strange_letters, f, ensure_ascii=False, indent=2)
+    if args.store:
+        build_letter_store(args.output, LETTERS_DB_PATH)
+        print(f"✅ Letter store rebuilt at {LETTERS_DB_PATH}")
 
-    print(f"✅ Saved {len(all_letters)} letters to {output_json}")
-    print(f"✅ Saved {len(strange_letters)} strange/unclassified items to {output_strange}")
+    # A non-zero exit keeps the ingest pipeline from marking the stage done
+    if failed:
+        sys.exit(1)
 
 if __name__ == "__main__":
-    process_all_files()
+    main()
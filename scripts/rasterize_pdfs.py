@@ -0,0 +1,122 @@
+import os
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tqdm import tqdm
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import IMAGES_DIR, ARCHIVE_PDF_DIR, RASTER_DIR, RASTER_MANIFEST_PATH
+from manifest import load_manifest, save_manifest
+from ocr_journal import file_hash
+from pdf_raster import is_current, page_count, page_path, rasterize_page
+
+def rasterize_pdfs(input_dir, output_dir, manifest_path, dpi=300, workers=None):
+    """Rasterize new or changed PDFs in ``input_dir``.
+
+    Pages of all PDFs are rendered concurrently, one page per task. A PDF is
+    recorded in the manifest only once all of its pages succeeded, so a
+    failed or interrupted run redoes it next time. Returns every page path
+    and the number of PDFs that failed.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_manifest(manifest_path)
+    pdfs = sorted(
+        entry.path
+        for entry in os.scandir(input_dir)
+        if entry.is_file() and entry.name.lower().endswith(".pdf")
+    )
+
+    def record(name, source_hash, pages):
+        # Drop pages that no longer exist in a shortened PDF
+        for stale in set(manifest.get(name, {}).get("pages", [])) - set(pages):
+            stale_path = os.path.join(output_dir, stale)
+            if os.path.exists(stale_path):
+                os.remove(stale_path)
+        manifest[name] = {"sha256": source_hash, "dpi": dpi, "pages": pages}
+        save_manifest(manifest_path, manifest)
+
+    jobs = []
+    pending = {}
+    unchanged = unreadable = 0
+    for pdf in pdfs:
+        name = os.path.basename(pdf)
+        source_hash = file_hash(pdf)
+        if is_current(manifest.get(name), source_hash, dpi, output_dir):
+            unchanged += 1
+            continue
+        try:
+            pages = page_count(pdf)
+        except Exception as e:
+            # Corrupt or encrypted: skip it, but keep rasterizing the others
+            print(f"❌ Error reading {name}: {e}")
+            unreadable += 1
+            continue
+        if pages == 0:
+            # Nothing to render; record it so it is not re-read every run
+            record(name, source_hash, [])
+            continue
+        pending[name] = {
+            "sha256": source_hash,
+            "pages": [os.path.basename(page_path(pdf, page, output_dir)) for page in range(1, pages + 1)],
+            "remaining": pages,
+            "failed": False
+        }
+        jobs += [(pdf, page) for page in range(1, pages + 1)]
+
+    print(f"{unchanged} PDFs unchanged, {len(pending)} to rasterize ({len(jobs)} pages)")
+
+    # Rendering is CPU-bound (poppler), so spread single pages across processes
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(rasterize_page, pdf, page, output_dir, dpi): pdf
+            for pdf, page in jobs
+        }
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Rasterizing pages"):
+            name = os.path.basename(futures[future])
+            state = pending[name]
+            try:
+                future.result()
+            except Exception as e:
+                tqdm.write(f"❌ Error rasterizing {name}: {e}")
+                state["failed"] = True
+            state["remaining"] -= 1
+            if state["remaining"] == 0 and not state["failed"]:
+                record(name, state["sha256"], state["pages"])
+
+    pages = [
+        os.path.join(output_dir, page)
+        for pdf in pdfs
+        for page in manifest.get(os.path.basename(pdf), {}).get("pages", [])
+    ]
+    return pages, unreadable + sum(state["failed"] for state in pending.values())
+
+def main():
+    parser = argparse.ArgumentParser(description="Rasterize scanned PDFs into one JPEG per page.")
+    parser.add_argument("--input-dir", default=ARCHIVE_PDF_DIR, help="Folder with the PDF scans")
+    parser.add_argument("--output-dir", default=RASTER_DIR, help="Folder for the page images")
+    parser.add_argument("--manifest", default=RASTER_MANIFEST_PATH, help="Manifest of rasterized PDFs")
+    parser.add_argument("--dpi", type=int, default=300, help="Rendering resolution")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Parallel processes")
+    parser.add_argument(
+        "--ocr",
+        action="store_true",
+        help=f"Then run OCR over {IMAGES_DIR} and the rasterized pages"
+    )
+    args = parser.parse_args()
+
+    pages, failed = rasterize_pdfs(args.input_dir, args.output_dir, args.manifest, args.dpi, args.workers)
+    print(f"✅ {len(pages)} page images in {args.output_dir}")
+    if failed:
+        print(f"❌ {failed} PDFs failed; run again to retry them")
+
+    if args.ocr:
+        from ocr_openai import process_all_files
+        failed += process_all_files(input_dirs=[IMAGES_DIR, args.output_dir])
+
+    # A non-zero exit keeps the ingest pipeline from marking the stage done
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import json
+
+import numpy as np
+import pytest
+
+from ann_index import IVFIndex, ann_path_for
+from corpus import Corpus
+from embedding_store import save_embedding_store
+from retrieval import build_embedding_matrix, top_k
+
+
+@pytest.fixture(scope="module")
+def clustered():
+    """2000 embeddings around 20 topics, plus 50 queries near those topics."""
+    rng = np.random.default_rng(1)
+    centers = rng.normal(size=(20, 32))
+    rows = centers[rng.integers(0, 20, 2000)] + 0.3 * rng.normal(size=(2000, 32))
+    queries = centers[rng.integers(0, 20, 50)] + 0.3 * rng.normal(size=(50, 32))
+    emb = build_embedding_matrix(list(rows))
+    return emb, IVFIndex.build(emb.matrix, n_lists=32), queries
+
+
+def test_every_row_is_in_exactly_one_list(clustered):
+    emb, ann, _ = clustered
+    assert ann.offsets[-1] == emb.matrix.shape[0]
+    assert sorted(ann.rows.tolist()) == list(range(emb.matrix.shape[0]))
+
+
+def test_recall_against_exact_search(clustered):
+    emb, ann, queries = clustered
+    recalls = []
+    for query in queries:
+        exact = {doc for _, doc in top_k(emb, query, k=10)}
+        approx = {doc for _, doc in top_k(emb, query, k=10, rows=ann.candidate_rows(query, nprobe=4))}
+        recalls.append(len(exact & approx) / 10)
+    assert np.mean(recalls) >= 0.95
+
+
+def test_probing_every_list_is_exact(clustered):
+    emb, ann, queries = clustered
+    for query in queries[:5]:
+        rows = ann.candidate_rows(query, nprobe=ann.n_lists)
+        assert [doc for _, doc in top_k(emb, query, k=10, rows=rows)] == [doc for _, doc in top_k(emb, query, k=10)]
+
+
+def test_save_and_load(clustered, tmp_path):
+    _, ann, queries = clustered
+    path = str(tmp_path / "index.ivf.npz")
+    ann.save(path)
+    loaded = IVFIndex.load(path)
+    assert loaded.count == ann.count
+    assert np.array_equal(loaded.candidate_rows(queries[0]), ann.candidate_rows(queries[0]))
+
+
+def test_corpus_uses_a_forced_index_below_the_build_threshold(tmp_path):
+    letters = [{"image_path": f"{i}.jpg", "text": f"carta {i}", "date": "01/01/1950"} for i in range(40)]
+    letters_path = str(tmp_path / "letters.json")
+    with open(letters_path, "w", encoding="utf-8") as f:
+        json.dump(letters, f)
+    matrix_path = str(tmp_path / "letter_embeddings.npy")
+    matrix = np.random.default_rng(0).normal(size=(40, 8)).astype(np.float32)
+    save_embedding_store(matrix_path, matrix, [letter["image_path"] for letter in letters], backend="openai", model="m")
+    IVFIndex.build(matrix, n_lists=4).save(ann_path_for(matrix_path))
+
+    corpus = Corpus(
+        "v1",
+        letters_path,
+        str(tmp_path / "letters.sqlite"),
+        str(tmp_path / "letters_lexical.npz"),
+        matrix_path,
+        str(tmp_path / "letter_embeddings.json"),
+    )
+    assert corpus.ann_index is not None
+    assert corpus.ann_index.count == 40
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+
+import pytest
+
+from drive_sync import MANIFEST_NAME, sync_folder
+
+FOLDER_ID = "folder"
+
+
+class FakeResponse:
+    def __init__(self, payload=None, content=b""):
+        self.payload = payload
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+class FakeDrive:
+    """Stands in for the Drive API session: one folder listing plus file contents."""
+
+    def __init__(self):
+        self.files = {}
+        self.contents = {}
+        self.downloads = []
+
+    def add(self, file_id, name, content, modified, md5=None):
+        self.files[file_id] = {
+            "id": file_id,
+            "name": name,
+            "mimeType": "application/pdf",
+            "modifiedTime": modified,
+            "md5Checksum": md5 or hashlib.md5(content).hexdigest(),
+            "size": str(len(content)),
+        }
+        self.contents[file_id] = content
+
+    def get(self, url, params=None, stream=False):
+        if params.get("alt") == "media":
+            file_id = url.rsplit("/", 1)[-1]
+            self.downloads.append(file_id)
+            return FakeResponse(content=self.contents[file_id])
+        assert "modifiedTime" not in params["q"]
+        return FakeResponse({"files": list(self.files.values())})
+
+
+@pytest.fixture
+def drive():
+    drive = FakeDrive()
+    drive.add("1", "a.pdf", b"first letter", "2024-01-01T00:00:00Z")
+    drive.add("2", "b.pdf", b"second letter", "2024-02-01T00:00:00Z")
+    return drive
+
+
+def read_manifest(root):
+    with open(os.path.join(root, MANIFEST_NAME), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_downloads_once_and_records_manifest(drive, tmp_path):
+    root = str(tmp_path)
+    assert sync_folder(drive, FOLDER_ID, root, workers=1) == (2, 0)
+    with open(os.path.join(root, "a.pdf"), "rb") as f:
+        assert f.read() == b"first letter"
+    assert set(read_manifest(root)["files"]) == {"1", "2"}
+
+    drive.downloads.clear()
+    assert sync_folder(drive, FOLDER_ID, root, workers=1) == (0, 0)
+    assert drive.downloads == []
+
+
+def test_checksum_mismatch_is_retried_on_next_run(drive, tmp_path):
+    root = str(tmp_path)
+    drive.add("3", "c.pdf", b"truncated", "2024-03-01T00:00:00Z", md5=hashlib.md5(b"complete").hexdigest())
+    assert sync_folder(drive, FOLDER_ID, root, workers=1) == (2, 1)
+    assert not os.path.exists(os.path.join(root, "c.pdf"))
+    assert "3" not in read_manifest(root)["files"]
+    assert [name for name in os.listdir(root) if name.endswith(".part")] == []
+
+    drive.contents["3"] = b"complete"
+    drive.downloads.clear()
+    assert sync_folder(drive, FOLDER_ID, root, workers=1) == (1, 0)
+    assert drive.downloads == ["3"]
+
+
+def test_moved_file_with_old_modified_time_is_synced(drive, tmp_path):
+    root = str(tmp_path)
+    sync_folder(drive, FOLDER_ID, root, workers=1)
+
+    # Moving a file into the folder keeps its original modifiedTime
+    drive.add("4", "moved.pdf", b"moved letter", "2020-05-01T00:00:00Z")
+    drive.downloads.clear()
+    assert sync_folder(drive, FOLDER_ID, root, workers=1) == (1, 0)
+    assert drive.downloads == ["4"]
+
+
+def test_changed_file_is_downloaded_again(drive, tmp_path):
+    root = str(tmp_path)
+    sync_folder(drive, FOLDER_ID, root, workers=1)
+
+    drive.add("1", "a.pdf", b"first letter, rescanned", "2024-01-01T00:00:00Z")
+    drive.downloads.clear()
+    assert sync_folder(drive, FOLDER_ID, root, workers=1) == (1, 0)
+    assert drive.downloads == ["1"]
+    with open(os.path.join(root, "a.pdf"), "rb") as f:
+        assert f.read() == b"first letter, rescanned"
+
+
+def test_identical_local_file_is_not_downloaded(drive, tmp_path):
+    root = str(tmp_path)
+    sync_folder(drive, FOLDER_ID, root, workers=1)
+    # A lost manifest is rebuilt from checksums instead of downloading everything
+    os.remove(os.path.join(root, MANIFEST_NAME))
+
+    drive.downloads.clear()
+    assert sync_folder(drive, FOLDER_ID, root, workers=1) == (0, 0)
+    assert drive.downloads == []
+    assert set(read_manifest(root)["files"]) == {"1", "2"}
+
+
+def test_removed_files_leave_the_manifest(drive, tmp_path):
+    root = str(tmp_path)
+    sync_folder(drive, FOLDER_ID, root, workers=1)
+
+    del drive.files["2"]
+    sync_folder(drive, FOLDER_ID, root, workers=1)
+    assert set(read_manifest(root)["files"]) == {"1"}
+    assert os.path.exists(os.path.join(root, "b.pdf"))
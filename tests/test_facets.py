@@ -0,0 +1,38 @@
+import datetime
+
+from facets import FacetIndex
+
+METADATA = [
+    {"position": 0, "sender": "João", "recipient": "Maria", "date_iso": "1950-03-01"},
+    {"position": 1, "sender": "joao ", "recipient": "Pedro", "date_iso": "1951-07-10"},
+    {"position": 2, "sender": "Maria", "recipient": "João", "date_iso": None},
+    {"position": 3, "sender": "João", "recipient": "Maria", "date_iso": "1952-01-01"},
+]
+
+
+def positions(result):
+    return None if result is None else result.tolist()
+
+
+def test_names_are_normalized():
+    facets = FacetIndex(METADATA)
+    assert positions(facets.filter(sender="JOÃO")) == [0, 1, 3]
+    assert facets.sender_options()[0] == ("João", "joao", 3)
+
+
+def test_filters_intersect():
+    facets = FacetIndex(METADATA)
+    assert positions(facets.filter(sender="joão", recipient="maria")) == [0, 3]
+    assert positions(facets.filter(sender="joão", recipient="maria", date_to="1951-12-31")) == [0]
+    assert positions(facets.filter(sender="joão", recipient="ninguém")) == []
+
+
+def test_date_range_is_inclusive_and_skips_undated():
+    facets = FacetIndex(METADATA)
+    assert positions(facets.filter(date_from=datetime.date(1951, 7, 10))) == [1, 3]
+    assert positions(facets.filter(date_from="1950-03-01", date_to="1951-07-10")) == [0, 1]
+    assert facets.year_range() == (1950, 1952)
+
+
+def test_no_filter_matches_everything():
+    assert FacetIndex(METADATA).filter() is None
@@ -0,0 +1,35 @@
+from lexical_index import LexicalIndex, analyze, fold, stem
+
+LETTERS = [
+    {"text": "Saudades, tantas saudades de casa", "from": "Ana", "to": "Pedro"},
+    {"text": "Chegamos bem ao Rio", "from": "Maria", "to": "Pedro"},
+    {"text": "Saudade da praia e de casa", "from": "Ana", "to": "Pedro"},
+    {"text": "Maria mandou lembranças", "from": "Ana", "to": "Pedro"},
+]
+
+
+def test_fold_strips_accents_and_case():
+    assert fold("Coração SÃO João") == "coracao sao joao"
+
+
+def test_stem_merges_plural_and_singular():
+    assert stem("cartas") == stem("carta")
+    assert analyze("Corações") == analyze("coração")
+
+
+def test_analyze_drops_stopwords():
+    assert analyze("Saudades de você e da família") == analyze("saudade família")
+
+
+def test_bm25_ranks_by_frequency_and_field_weight():
+    index = LexicalIndex.build(LETTERS)
+    # Two mentions outrank one in a letter of similar length
+    assert [doc for _, doc in index.search("saudade")] == [0, 2]
+    # A name in the sender field weighs more than one in the text
+    assert [doc for _, doc in index.search("MARIA")] == [1, 3]
+    assert index.search("inexistente") == []
+
+
+def test_search_restricted_to_allowed_letters():
+    index = LexicalIndex.build(LETTERS)
+    assert [doc for _, doc in index.search("casa", allowed=[2, 3])] == [2]
@@ -0,0 +1,98 @@
+import json
+import threading
+import time
+
+import pytest
+
+from ocr_journal import Journal, compact
+
+
+def test_follow_ignores_end_of_earlier_run(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    with Journal(path) as journal:
+        journal.append({"event": "start"})
+        journal.append({"key": "a", "image_path": "a.jpg", "status": "ok", "record": {}})
+        journal.append({"event": "end"})
+
+    seen = []
+    follower = threading.Thread(
+        target=lambda: seen.extend(Journal(path).follow(poll_interval=0.01, idle_timeout=5))
+    )
+    follower.start()
+    time.sleep(0.1)
+    # The earlier run's end must not stop the follower before the new run
+    assert follower.is_alive()
+
+    with Journal(path) as journal:
+        journal.append({"event": "start"})
+        journal.append({"key": "b", "image_path": "b.jpg", "status": "ok", "record": {}})
+        journal.append({"event": "end"})
+    follower.join(timeout=5)
+
+    assert not follower.is_alive()
+    assert [entry.get("image_path") for entry in seen if "key" in entry] == ["a.jpg", "b.jpg"]
+
+
+def test_follow_stops_at_end_of_running_run(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = Journal(path)
+    journal.append({"event": "start"})
+    journal.append({"key": "a", "image_path": "a.jpg", "status": "ok", "record": {}})
+
+    entries = Journal(path).follow(poll_interval=0.01, idle_timeout=5)
+    assert next(entries)["event"] == "start"
+    assert next(entries)["key"] == "a"
+
+    journal.append({"event": "end"})
+    journal.close()
+    assert [entry.get("event") for entry in entries] == ["end"]
+
+
+def test_follow_stops_when_idle(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    with Journal(path) as journal:
+        journal.append({"event": "start"})
+        journal.append({"event": "end"})
+
+    start = time.perf_counter()
+    entries = list(Journal(path).follow(poll_interval=0.01, idle_timeout=0.2))
+    assert [entry["event"] for entry in entries] == ["start", "end"]
+    assert time.perf_counter() - start >= 0.2
+
+
+LETTER = {"is_letter": True, "date": "01/02/1950", "text": "Querida Judith, saudades de todos."}
+
+
+def write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def read_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_compact_refuses_an_empty_journal(tmp_path):
+    letters_path = str(tmp_path / "letters.json")
+    write_json(letters_path, [dict(LETTER, image_path="a.jpg")])
+
+    with pytest.raises(ValueError):
+        compact(Journal(str(tmp_path / "missing.jsonl")), letters_path, str(tmp_path / "strange.json"))
+    assert len(read_json(letters_path)) == 1
+
+
+def test_compact_overlays_the_journal_on_existing_records(tmp_path):
+    letters_path = str(tmp_path / "letters.json")
+    strange_path = str(tmp_path / "strange.json")
+    write_json(letters_path, [dict(LETTER, image_path="a.jpg"), dict(LETTER, image_path="b.jpg")])
+    write_json(strange_path, [{"is_letter": False, "image_path": "c.jpg"}])
+
+    with Journal(str(tmp_path / "journal.jsonl")) as journal:
+        journal.append({"key": "b", "image_path": "b.jpg", "status": "ok", "record": {"is_letter": False, "image_path": "b.jpg"}})
+        journal.append({"key": "a", "image_path": "a.jpg", "status": "error", "error": "timeout"})
+    assert compact(journal, letters_path, strange_path) == (1, 2)
+
+    # A failed retry keeps the earlier transcription; scans outside the journal are kept
+    assert [r["image_path"] for r in read_json(letters_path)] == ["a.jpg"]
+    assert [r["image_path"] for r in read_json(strange_path)] == ["b.jpg", "c.jpg"]
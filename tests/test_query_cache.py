@@ -0,0 +1,41 @@
+import sqlite3
+
+from query_cache import QueryEmbeddingCache
+
+
+def last_used(path, query):
+    with sqlite3.connect(path) as db:
+        return db.execute("SELECT last_used FROM query_embeddings WHERE query = ?", (query,)).fetchone()[0]
+
+
+def test_memory_hits_keep_hot_queries_on_disk(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = QueryEmbeddingCache(path, max_size=2, touch_batch=1)
+    cache.put("hot", "m", [1.0])
+    cache.put("cold", "m", [2.0])
+    before = last_used(path, "hot")
+
+    # Only a memory hit: the disk row must be refreshed too
+    assert cache.get("Hot", "m") is not None
+    assert cache.disk_hits == 0
+    assert last_used(path, "hot") > before
+
+    cache.put("new", "m", [3.0])
+    reopened = QueryEmbeddingCache(path, max_size=2)
+    assert reopened.get("hot", "m") is not None
+    assert reopened.get("cold", "m") is None
+
+
+def test_touches_are_batched(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = QueryEmbeddingCache(path, touch_batch=3, touch_interval=3600)
+    cache.put("a", "m", [1.0])
+    stored = last_used(path, "a")
+
+    cache.get("a", "m")
+    cache.get("a", "m")
+    assert last_used(path, "a") == stored
+
+    stats = cache.stats()
+    assert last_used(path, "a") > stored
+    assert (stats["hits"], stats["misses"], stats["stored"]) == (2, 0, 1)
@@ -0,0 +1,28 @@
+from PIL import Image, ImageDraw
+
+from scan_preprocess import prepare_scan
+
+
+def write_scan(path, size, text_box):
+    """White page with lines of "writing" only inside ``text_box``."""
+    img = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(img)
+    left, top, right, bottom = text_box
+    for y in range(top, bottom, 30):
+        draw.line((left, y, right, y), fill="black", width=4)
+    img.save(path, quality=90)
+
+
+def test_crop_keeps_resolution_of_small_written_area(tmp_path):
+    path = str(tmp_path / "scan.jpg")
+    write_scan(path, (4000, 3000), (1400, 1050, 2600, 1950))
+    scan = prepare_scan(path, long_edge=1600, max_bytes=10_000_000)
+    # The written area is ~1200 px wide in the source; a reduced decode would halve it
+    assert scan.width >= 1200
+
+
+def test_large_written_area_is_downsampled_to_long_edge(tmp_path):
+    path = str(tmp_path / "scan.jpg")
+    write_scan(path, (4000, 3000), (200, 200, 3800, 2800))
+    scan = prepare_scan(path, long_edge=1600, max_bytes=10_000_000)
+    assert max(scan.width, scan.height) == 1600
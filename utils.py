@@ -1,38 +1,237 @@
 """Utility functions for the Judith Tribute App."""
 
-import json
 import os
-from PIL import Image
+import functools
 import streamlit as st
-from config import LETTERS_PATH, EMBEDDINGS_PATH, IMAGES_DIR
+from config import (
+    LETTERS_PATH,
+    LETTERS_DB_PATH,
+    LEXICAL_INDEX_PATH,
+    EMBEDDINGS_PATH,
+    EMBEDDINGS_MATRIX_PATH,
+    IMAGES_DIR,
+    PHOTOS_DIR,
+    PHOTO_MANIFEST_PATH,
+    DERIVATIVES_DIR,
+    DERIVATIVE_WIDTHS,
+    LETTER_IMAGE_WIDTH,
+    QUERY_CACHE_PATH,
+    QUERY_CACHE_SIZE,
+    EMBEDDING_BACKEND,
+    EMBEDDING_MODEL,
+)
+from image_derivatives import best_derivative
+from instrumentation import rerun, span
+from photo_catalog import load_catalog
+
+# The corpus, embedding and query-cache modules pull in numpy and the search
+# stack; they are imported on first use so pages without search start faster.
+
+@st.cache_resource(max_entries=1)
+def _load_corpus(version):
+    """One shared corpus snapshot per version of the source files."""
+    from corpus import Corpus
+    return Corpus(
+        version,
+        LETTERS_PATH,
+        LETTERS_DB_PATH,
+        LEXICAL_INDEX_PATH,
+        EMBEDDINGS_MATRIX_PATH,
+        EMBEDDINGS_PATH,
+    )
+
+def get_corpus():
+    """Current corpus snapshot, shared by reference across sessions.
+
+    Checking for a new version costs a few ``stat`` calls per rerun,
+    whatever the size of the corpus.
+    """
+    from corpus import Corpus, corpus_version
+    with span("corpus"):
+        sources = Corpus.source_paths(LETTERS_PATH, EMBEDDINGS_MATRIX_PATH, EMBEDDINGS_PATH)
+        return _load_corpus(corpus_version(sources))
 
-@st.cache_data
 def load_letters():
-    """Load letters data from JSON file."""
-    with open(LETTERS_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
+    """List-like view over the letter store; only displayed rows are read."""
+    corpus = get_corpus()
+    with span("load_letters"):
+        return corpus.letters
+
+def load_facets():
+    """Date/sender/recipient facet indexes of the current corpus."""
+    corpus = get_corpus()
+    with span("load_facets"):
+        return corpus.facets
+
+def load_lexical_index():
+    """BM25 keyword index of the current corpus."""
+    corpus = get_corpus()
+    with span("load_lexical_index"):
+        return corpus.lexical_index
 
-@st.cache_data
 def load_embeddings():
-    """Load embeddings data from JSON file."""
-    with open(EMBEDDINGS_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
+    """Memory-mapped embedding store (or the legacy JSON converted in memory)."""
+    corpus = get_corpus()
+    with span("load_embeddings"):
+        return corpus.embeddings
+
+def load_embedding_matrix():
+    """Embeddings aligned with the letters of the current corpus."""
+    corpus = get_corpus()
+    with span("load_embedding_matrix"):
+        return corpus.embedding_matrix
+
+def load_ann_index():
+    """IVF index for large stores; None means search stays exact."""
+    corpus = get_corpus()
+    with span("load_ann_index"):
+        return corpus.ann_index
+
+@st.cache_resource(max_entries=1)
+def _load_photo_catalog(dir_mtime):
+    """Photo manifest for one version of the photo folder."""
+    return tuple(load_catalog(PHOTOS_DIR, PHOTO_MANIFEST_PATH))
+
+def load_photo_catalog():
+    """Photo manifest, rescanned only when the photo folder's mtime changes."""
+    with span("load_photo_catalog"):
+        try:
+            dir_mtime = os.stat(PHOTOS_DIR).st_mtime_ns
+        except FileNotFoundError:
+            return ()
+        return _load_photo_catalog(dir_mtime)
+
+@st.cache_resource
+def _get_backend(name, model):
+    """Load each embedding backend (and its model) once per server."""
+    from embedding_backends import get_backend
+    return get_backend(name, model)
+
+def embedding_model():
+    """``(backend name, model)`` that produced the current embedding store.
+
+    Read from the store's metadata alone, so it works without the backend's
+    API key or model files (for example to look up cached query vectors).
+    """
+    from embedding_backends import DEFAULT_MODELS
+    meta = load_embeddings().meta
+    name = meta.get("backend", EMBEDDING_BACKEND)
+    return name, meta.get("model") or EMBEDDING_MODEL or DEFAULT_MODELS.get(name)
+
+def get_embedding_backend():
+    """The backend that produced the current embedding store."""
+    meta = load_embeddings().meta
+    backend = _get_backend(*embedding_model())
+    if backend.dim is not None and meta.get("dim") not in (None, backend.dim):
+        raise ValueError(
+            f"Embedding store has dimension {meta['dim']} but {backend.model} produces {backend.dim}"
+        )
+    return backend
+
+@st.cache_resource
+def get_query_cache():
+    """Query-embedding cache shared by all sessions of this server."""
+    from query_cache import QueryEmbeddingCache
+    return QueryEmbeddingCache(QUERY_CACHE_PATH, max_size=QUERY_CACHE_SIZE)
+
+def page_fragment(page):
+    """``st.fragment`` whose partial reruns are also recorded by the instrumentation.
+
+    Widgets inside the fragment rerun only the fragment, not the whole page.
+    """
+    def decorator(render):
+        @functools.wraps(render)
+        def wrapper(*args, **kwargs):
+            with rerun(page, fragment=render.__name__):
+                return render(*args, **kwargs)
+        return st.fragment(wrapper)
+    return decorator
+
+def scan_path(image_path):
+    """Local file of a letter scan.
+
+    ``image_path`` is stored relative to the app root (scans in IMAGES_DIR,
+    PDF pages in RASTER_DIR); records written with another prefix fall back
+    to the scan of the same name in IMAGES_DIR.
+    """
+    if os.path.exists(image_path):
+        return image_path
+    return os.path.join(IMAGES_DIR, os.path.basename(image_path))
+
+def show_facet_filters(key):
+    """Show sender, recipient and period filters.
+
+    Returns the sorted positions of the matching letters, or None when no
+    filter is active. ``key`` keeps widgets on different pages independent.
+    """
+    facets = load_facets()
+    with st.expander("🔎 Filtrar cartas", expanded=False):
+        col1, col2 = st.columns(2)
+        with col1:
+            senders = {name_key: f"{label} ({count})" for label, name_key, count in facets.sender_options()}
+            sender = st.selectbox(
+                "De:",
+                options=[None] + list(senders),
+                format_func=lambda k: "Todos" if k is None else senders[k],
+                key=f"{key}-sender"
+            )
+        with col2:
+            recipients = {name_key: f"{label} ({count})" for label, name_key, count in facets.recipient_options()}
+            recipient = st.selectbox(
+                "Para:",
+                options=[None] + list(recipients),
+                format_func=lambda k: "Todos" if k is None else recipients[k],
+                key=f"{key}-recipient"
+            )
+        
+        date_from = date_to = None
+        years = facets.year_range()
+        if years and years[0] < years[1]:
+            selected = st.slider(
+                "Período:",
+                min_value=years[0],
+                max_value=years[1],
+                value=years,
+                key=f"{key}-years",
+                help="Ao restringir o período, cartas sem data deixam de aparecer"
+            )
+            if tuple(selected) != years:
+                date_from = f"{selected[0]}-01-01"
+                date_to = f"{selected[1]}-12-31"
+    
+    with span("facet_filter"):
+        return facets.filter(
+            sender=sender,
+            recipient=recipient,
+            date_from=date_from,
+            date_to=date_to
+        )
 
 def show_letter(letter):
     """Display a letter in a beautiful card format."""
+    with span("show_letter"):
+        _show_letter(letter)
+
+def _show_letter(letter):
     st.markdown("<div class='letter-card'>", unsafe_allow_html=True)
     col1, col2 = st.columns([1, 2])
     
     with col1:
         img_path = letter.get("image_path")
         if img_path:
-            full_img_path = os.path.join(IMAGES_DIR, os.path.basename(img_path))
+            full_img_path = scan_path(img_path)
             if os.path.exists(full_img_path):
-                st.image(
-                    Image.open(full_img_path),
-                    caption="Imagem da carta",
-                    use_container_width=True
-                )
+                # Serve a pre-sized WebP; the full scan is only read on request
+                with span("show_letter.derivative"):
+                    derivative = best_derivative(
+                        full_img_path,
+                        LETTER_IMAGE_WIDTH,
+                        DERIVATIVE_WIDTHS,
+                        DERIVATIVES_DIR
+                    )
+                st.image(derivative, caption="Imagem da carta", use_container_width=True)
+                if st.toggle("🔍 Ver original", key=f"original-{img_path}"):
+                    st.image(full_img_path, use_container_width=True)
             else:
                 st.write("📸 Imagem não encontrada")
     